@@ -1,5 +1,6 @@
 local config = require("zdo_immersive_morrowind_ai.config")
 local util = require("zdo_immersive_morrowind_ai.common.util")
+local msgpack = require("zdo_immersive_morrowind_ai.common.msgpack")
 
 local socket = require("socket")
 local bit = require("bit")
@@ -16,6 +17,9 @@ this.events_to_produce = {}
 this.next_event_id = 1
 this.connection_maintaining_loop_started = false
 
+-- Highest bit of the frame size marks a msgpack body, JSON otherwise.
+local msgpack_frame_flag = 0x80000000
+
 function this.produce_event_from_game(e)
     if this.state ~= state_active then
         util.debug("Skip producing event because not connected to the server")
@@ -62,7 +66,8 @@ function this.unpack_be_uint32(packed)
     local b1 = string.byte(packed, 3, 3)
     local b2 = string.byte(packed, 2, 2)
     local b3 = string.byte(packed, 1, 1)
-    local int_value = b0 + bit.lshift(b1, 8) + bit.lshift(b2, 16) + bit.lshift(b3, 24)
+    -- Not using bit.lshift for b3 as it would overflow into negative int32.
+    local int_value = b0 + bit.lshift(b1, 8) + bit.lshift(b2, 16) + b3 * 0x1000000
     return int_value
 end
 
@@ -80,12 +85,22 @@ function this.run_producer()
             end
 
             for _, e in pairs(this.events_to_produce) do
-                local payload = json.encode(e)
-                util.debug("Publishing '%s'", payload)
+                local payload
+                local size
+                if config.wire_format_msgpack then
+                    payload = msgpack.encode(e)
+                    size = string.len(payload)
+                    util.debug("Publishing msgpack event %s", e["event_id"])
+                    util.debug("size=%d", size)
+                    size = size + msgpack_frame_flag
+                else
+                    payload = json.encode(e)
+                    size = string.len(payload)
+                    util.debug("Publishing '%s'", payload)
+                    util.debug("size=%d", size)
+                end
 
-                local size = string.len(payload)
                 local size_encoded = this.pack_be_uint32(size)
-                util.debug("size=%d", size)
 
                 local index_of_last_byte_sent, status = this.tcp:send(size_encoded)
                 if index_of_last_byte_sent == nil then
@@ -105,6 +120,7 @@ end
 
 function this.run_consumer()
     local expecting_header = true
+    local expecting_msgpack = false
     local receiving_buf_expected_size = 4
     local receiving_buf = ''
 
@@ -140,14 +156,24 @@ function this.run_consumer()
 
                 if expecting_header then
                     local len = this.unpack_be_uint32(receiving_buf)
+                    expecting_msgpack = len >= msgpack_frame_flag
+                    if expecting_msgpack then
+                        len = len - msgpack_frame_flag
+                    end
                     util.debug("Received header, size=%d", len)
 
                     receiving_buf_expected_size = len
                     receiving_buf = ''
                     expecting_header = false
                 else
-                    util.debug("Received message: %s", receiving_buf)
-                    local e = json.decode(receiving_buf)
+                    local e
+                    if expecting_msgpack then
+                        e = msgpack.decode(receiving_buf)
+                        util.debug("Received msgpack message, event_id=%s", e["event_id"])
+                    else
+                        util.debug("Received message: %s", receiving_buf)
+                        e = json.decode(receiving_buf)
+                    end
                     event.trigger("zdo_ai_rpg:event_from_server", e)
 
                     receiving_buf_expected_size = 4
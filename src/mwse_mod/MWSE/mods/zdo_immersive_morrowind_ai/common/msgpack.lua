@@ -0,0 +1,287 @@
+-- Minimal MessagePack codec for events exchanged with the server.
+-- Tables follow the same rules as dkjson: empty tables and tables with keys 1..n are arrays,
+-- everything else is a map with string keys.
+local this = {}
+
+local byte = string.byte
+local char = string.char
+local floor = math.floor
+local frexp = math.frexp
+local ldexp = math.ldexp
+local concat = table.concat
+
+local function be_bytes(n, count)
+    local bytes = {}
+    for i = count, 1, -1 do
+        bytes[i] = n % 256
+        n = floor(n / 256)
+    end
+    return char(unpack(bytes))
+end
+
+local function pack_double(v)
+    local sign = 0
+    if v < 0 or (v == 0 and 1 / v < 0) then
+        sign = 0x80
+        v = -v
+    end
+
+    if v ~= v then
+        return char(0xcb, 0x7f, 0xf8, 0, 0, 0, 0, 0, 0)
+    elseif v == math.huge then
+        return char(0xcb, sign + 0x7f, 0xf0, 0, 0, 0, 0, 0, 0)
+    elseif v == 0 then
+        return char(0xcb, sign, 0, 0, 0, 0, 0, 0, 0)
+    end
+
+    local mantissa, exponent = frexp(v)
+    local fraction
+    exponent = exponent + 1022
+    if exponent <= 0 then
+        -- subnormal
+        fraction = ldexp(v, 1074)
+        exponent = 0
+    else
+        fraction = ldexp(mantissa, 53) - 2 ^ 52
+    end
+
+    local bytes = {}
+    for i = 8, 3, -1 do
+        bytes[i] = fraction % 256
+        fraction = floor(fraction / 256)
+    end
+    bytes[2] = (exponent % 16) * 16 + fraction
+    bytes[1] = sign + floor(exponent / 16)
+
+    return char(0xcb, unpack(bytes))
+end
+
+local function pack_number(v)
+    if v ~= v or v == math.huge or v == -math.huge or floor(v) ~= v or v >= 2 ^ 53 or v < -2 ^ 31 then
+        return pack_double(v)
+    end
+
+    if v >= 0 then
+        if v < 128 then
+            return char(v)
+        elseif v < 256 then
+            return char(0xcc, v)
+        elseif v < 65536 then
+            return char(0xcd) .. be_bytes(v, 2)
+        elseif v < 4294967296 then
+            return char(0xce) .. be_bytes(v, 4)
+        else
+            return char(0xcf) .. be_bytes(v, 8)
+        end
+    else
+        if v >= -32 then
+            return char(256 + v)
+        elseif v >= -128 then
+            return char(0xd0, 256 + v)
+        elseif v >= -32768 then
+            return char(0xd1) .. be_bytes(65536 + v, 2)
+        else
+            return char(0xd2) .. be_bytes(4294967296 + v, 4)
+        end
+    end
+end
+
+local function pack_string(s)
+    local n = #s
+    if n < 32 then
+        return char(0xa0 + n) .. s
+    elseif n < 256 then
+        return char(0xd9, n) .. s
+    elseif n < 65536 then
+        return char(0xda) .. be_bytes(n, 2) .. s
+    else
+        return char(0xdb) .. be_bytes(n, 4) .. s
+    end
+end
+
+local function pack_header(n, fix, fix_max, h16, h32)
+    if n < fix_max then
+        return char(fix + n)
+    elseif n < 65536 then
+        return char(h16) .. be_bytes(n, 2)
+    else
+        return char(h32) .. be_bytes(n, 4)
+    end
+end
+
+local pack_value
+
+local function pack_table(t, buf)
+    local count = 0
+    for _ in pairs(t) do
+        count = count + 1
+    end
+
+    local n = #t
+    if count == n then
+        table.insert(buf, pack_header(n, 0x90, 16, 0xdc, 0xdd))
+        for i = 1, n do
+            pack_value(t[i], buf)
+        end
+    else
+        table.insert(buf, pack_header(count, 0x80, 16, 0xde, 0xdf))
+        for k, v in pairs(t) do
+            table.insert(buf, pack_string(tostring(k)))
+            pack_value(v, buf)
+        end
+    end
+end
+
+pack_value = function(v, buf)
+    local t = type(v)
+    if t == "nil" then
+        table.insert(buf, char(0xc0))
+    elseif t == "boolean" then
+        table.insert(buf, char(v and 0xc3 or 0xc2))
+    elseif t == "number" then
+        table.insert(buf, pack_number(v))
+    elseif t == "string" then
+        table.insert(buf, pack_string(v))
+    elseif t == "table" then
+        pack_table(v, buf)
+    else
+        error("msgpack: cannot encode value of type " .. t)
+    end
+end
+
+function this.encode(v)
+    local buf = {}
+    pack_value(v, buf)
+    return concat(buf)
+end
+
+local function read_uint(s, pos, count)
+    local n = 0
+    for i = pos, pos + count - 1 do
+        n = n * 256 + byte(s, i)
+    end
+    return n
+end
+
+local function read_int(s, pos, count)
+    if count == 8 then
+        -- keep precision of the low part for big negative numbers
+        return read_int(s, pos, 4) * 4294967296 + read_uint(s, pos + 4, 4)
+    end
+
+    local n = read_uint(s, pos, count)
+    local half = 2 ^ (count * 8 - 1)
+    if n >= half then
+        n = n - 2 * half
+    end
+    return n
+end
+
+local function read_float(s, pos)
+    local b1, b2, b3, b4 = byte(s, pos, pos + 3)
+    local sign = b1 >= 128 and -1 or 1
+    local exponent = (b1 % 128) * 2 + floor(b2 / 128)
+    local fraction = ((b2 % 128) * 256 + b3) * 256 + b4
+
+    if exponent == 0 then
+        return sign * ldexp(fraction, -149)
+    elseif exponent == 255 then
+        return fraction == 0 and sign * math.huge or 0 / 0
+    end
+    return sign * ldexp(fraction + 2 ^ 23, exponent - 150)
+end
+
+local function read_double(s, pos)
+    local b1, b2 = byte(s, pos, pos + 1)
+    local sign = b1 >= 128 and -1 or 1
+    local exponent = (b1 % 128) * 16 + floor(b2 / 16)
+    local fraction = (b2 % 16) * 2 ^ 48 + read_uint(s, pos + 2, 6)
+
+    if exponent == 0 then
+        return sign * ldexp(fraction, -1074)
+    elseif exponent == 2047 then
+        return fraction == 0 and sign * math.huge or 0 / 0
+    end
+    return sign * ldexp(fraction + 2 ^ 52, exponent - 1075)
+end
+
+local unpack_value
+
+local function unpack_array(s, pos, n)
+    local t = {}
+    for i = 1, n do
+        t[i], pos = unpack_value(s, pos)
+    end
+    return t, pos
+end
+
+local function unpack_map(s, pos, n)
+    local t = {}
+    for _ = 1, n do
+        local k, v
+        k, pos = unpack_value(s, pos)
+        v, pos = unpack_value(s, pos)
+        t[k] = v
+    end
+    return t, pos
+end
+
+unpack_value = function(s, pos)
+    local b = byte(s, pos)
+    pos = pos + 1
+
+    if b < 0x80 then
+        return b, pos
+    elseif b < 0x90 then
+        return unpack_map(s, pos, b - 0x80)
+    elseif b < 0xa0 then
+        return unpack_array(s, pos, b - 0x90)
+    elseif b < 0xc0 then
+        local n = b - 0xa0
+        return s:sub(pos, pos + n - 1), pos + n
+    elseif b >= 0xe0 then
+        return b - 256, pos
+    elseif b == 0xc0 then
+        return nil, pos
+    elseif b == 0xc2 then
+        return false, pos
+    elseif b == 0xc3 then
+        return true, pos
+    elseif b == 0xc4 or b == 0xd9 then
+        local n = byte(s, pos)
+        return s:sub(pos + 1, pos + n), pos + 1 + n
+    elseif b == 0xc5 or b == 0xda then
+        local n = read_uint(s, pos, 2)
+        return s:sub(pos + 2, pos + 1 + n), pos + 2 + n
+    elseif b == 0xc6 or b == 0xdb then
+        local n = read_uint(s, pos, 4)
+        return s:sub(pos + 4, pos + 3 + n), pos + 4 + n
+    elseif b == 0xca then
+        return read_float(s, pos), pos + 4
+    elseif b == 0xcb then
+        return read_double(s, pos), pos + 8
+    elseif b >= 0xcc and b <= 0xcf then
+        local count = 2 ^ (b - 0xcc)
+        return read_uint(s, pos, count), pos + count
+    elseif b >= 0xd0 and b <= 0xd3 then
+        local count = 2 ^ (b - 0xd0)
+        return read_int(s, pos, count), pos + count
+    elseif b == 0xdc then
+        return unpack_array(s, pos + 2, read_uint(s, pos, 2))
+    elseif b == 0xdd then
+        return unpack_array(s, pos + 4, read_uint(s, pos, 4))
+    elseif b == 0xde then
+        return unpack_map(s, pos + 2, read_uint(s, pos, 2))
+    elseif b == 0xdf then
+        return unpack_map(s, pos + 4, read_uint(s, pos, 4))
+    end
+
+    error(string.format("msgpack: unsupported type 0x%x", b))
+end
+
+function this.decode(s)
+    local v = unpack_value(s, 1)
+    return v
+end
+
+return this
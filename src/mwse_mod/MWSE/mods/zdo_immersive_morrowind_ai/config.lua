@@ -4,6 +4,8 @@ local defaultConfig = {
     server_host = 'localhost',
     server_port = 18080,
     auto_reconnect = true,
+    -- Server answers in msgpack too if it's enabled in its config
+    wire_format_msgpack = false,
 
     debug = false,
 
@@ -6,6 +6,7 @@ local eventbus = require("zdo_immersive_morrowind_ai.common.eventbus")
 local player_service = require("zdo_immersive_morrowind_ai.service.player_service")
 local env_service = require("zdo_immersive_morrowind_ai.service.env_service")
 local npc_service = require("zdo_immersive_morrowind_ai.service.npc_service")
+local scene_service = require("zdo_immersive_morrowind_ai.service.scene_service")
 local stt_service = require("zdo_immersive_morrowind_ai.service.stt_service")
 local actor_say_service = require("zdo_immersive_morrowind_ai.service.actor_say_service")
 
@@ -36,6 +37,7 @@ function this.setup()
 
                 player_service.setup()
                 env_service.setup()
+                scene_service.setup()
             end
 
             npc_service.setup(first_time_loaded)
@@ -35,6 +35,13 @@ category:createYesNoButton({
         table = config
     }
 })
+category:createYesNoButton({
+    label = "Use compact binary messages (msgpack)",
+    variable = mwse.mcm.createTableVariable {
+        id = "wire_format_msgpack",
+        table = config
+    }
+})
 category:createButton{
     buttonText = "Manually connect to the server now",
     callback = function()
@@ -255,6 +255,22 @@ function this.setup(first_time_loaded)
                     npc_data = this.get_npc_data(e["data"]["npc_ref_id"])
                 }
             })
+        elseif e["data"]["type"] == "get_npcs_request" then
+            local known_versions = e["data"]["known_npc_data_versions"] or {}
+            local npc_data_updates = {}
+            for _, npc_ref_id in pairs(e["data"]["npc_ref_ids"]) do
+                local npc_data_update = this.get_npc_data_update(npc_ref_id, known_versions[npc_ref_id])
+                if npc_data_update ~= nil then
+                    table.insert(npc_data_updates, npc_data_update)
+                end
+            end
+
+            eventbus.produce_response_event(e, {
+                data = {
+                    type = "get_npcs_response",
+                    npc_data_updates = npc_data_updates
+                }
+            })
         elseif e["data"]["type"] == "npc_say_mp3" then
             local ref = tes3.getReference(e["data"]["npc_ref_id"])
             this.npc_ref_id_to_audio_pitch[ref.id] = e["data"]["pitch"]
@@ -503,47 +519,11 @@ function this.setup(first_time_loaded)
                 temporary = false
             })
         elseif e["data"]["type"] == "get_actors_nearby_request" then
-            local base_actor_ref = tes3.mobilePlayer.reference
-
-            if e["data"]["actor_ref_id"] then
-                base_actor_ref = tes3.getReference(e["data"]["actor_ref_id"])
-            end
-
-            local mobile_list = tes3.findActorsInProximity({
-                reference = base_actor_ref,
-                range = e["data"]["radius_ingame"] or (30 * 64)
-            })
-            local actor_ref_list = {}
-            for _, v in pairs(mobile_list) do
-                if v ~= base_actor_ref.mobile then
-                    local actor_ref = util.get_actor_ref_from_mobile(v)
-                    if actor_ref ~= nil then
-                        local actor = {
-                            actor_ref = actor_ref,
-                            distance_ingame = v.playerDistance
-                        }
-                        if base_actor_ref ~= tes3.mobilePlayer.reference then
-                            actor["distance_ingame"] = base_actor_ref.position:distance(actor_ref.position)
-                        end
-
-                        if e["data"]["test_line_of_sight"] then
-                            actor["can_see"] = tes3.testLineOfSight({
-                                reference1 = v.reference,
-                                height1 = 2,
-                                reference2 = base_actor_ref,
-                                height2 = 2
-                            })
-                        end
-
-                        table.insert(actor_ref_list, actor)
-                    end
-                end
-            end
-
             eventbus.produce_response_event(e, {
                 data = {
                     type = "get_actors_nearby_response",
-                    actors = actor_ref_list
+                    actors = this.get_actors_nearby(e["data"]["actor_ref_id"], e["data"]["radius_ingame"],
+                        e["data"]["test_line_of_sight"])
                 }
             })
         end
@@ -706,6 +686,47 @@ function this.setup(first_time_loaded)
     })
 end
 
+function this.get_actors_nearby(actor_ref_id, radius_ingame, test_line_of_sight)
+    local base_actor_ref = tes3.mobilePlayer.reference
+
+    if actor_ref_id then
+        base_actor_ref = tes3.getReference(actor_ref_id)
+    end
+
+    local mobile_list = tes3.findActorsInProximity({
+        reference = base_actor_ref,
+        range = radius_ingame or (30 * 64)
+    })
+    local actor_ref_list = {}
+    for _, v in pairs(mobile_list) do
+        if v ~= base_actor_ref.mobile then
+            local actor_ref = util.get_actor_ref_from_mobile(v)
+            if actor_ref ~= nil then
+                local actor = {
+                    actor_ref = actor_ref,
+                    distance_ingame = v.playerDistance
+                }
+                if base_actor_ref ~= tes3.mobilePlayer.reference then
+                    actor["distance_ingame"] = base_actor_ref.position:distance(actor_ref.position)
+                end
+
+                if test_line_of_sight then
+                    actor["can_see"] = tes3.testLineOfSight({
+                        reference1 = v.reference,
+                        height1 = 2,
+                        reference2 = base_actor_ref,
+                        height2 = 2
+                    })
+                end
+
+                table.insert(actor_ref_list, actor)
+            end
+        end
+    end
+
+    return actor_ref_list
+end
+
 function this.ashfall_getStewCost(merchantObj)
     local dispMulti = 3.0
     local personalityMulti = 2.0
@@ -862,4 +883,112 @@ function this.get_npc_data(ref_id)
     }
 end
 
+-- Versions are unique per game session, server keeps whatever it got from the previous one.
+this.npc_data_epoch = tostring(os.time())
+this.npc_ref_id_to_npc_data_version = {}
+-- Counter is shared by all NPCs, so a version is never reused after its NPC is evicted.
+this.npc_data_version_counter = 0
+this.npc_data_version_tick = 0
+this.npc_data_version_count = 0
+this.max_npc_data_version_count = 300
+
+function this.evict_npc_data_versions()
+    -- Least recently used quarter is dropped in one go, so the scan runs rarely.
+    local entries = {}
+    for ref_id, v in pairs(this.npc_ref_id_to_npc_data_version) do
+        table.insert(entries, { ref_id = ref_id, used_at = v.used_at })
+    end
+    table.sort(entries, function(a, b) return a.used_at < b.used_at end)
+
+    local remove_count = #entries - math.floor(this.max_npc_data_version_count * 3 / 4)
+    for i = 1, remove_count do
+        this.npc_ref_id_to_npc_data_version[entries[i].ref_id] = nil
+    end
+    this.npc_data_version_count = #entries - math.max(0, remove_count)
+end
+
+function this.get_npc_data_update(ref_id, known_version)
+    local npc_data = this.get_npc_data(ref_id)
+    if npc_data == nil then
+        return nil
+    end
+
+    local encoded_fields = {}
+    for field, value in pairs(npc_data) do
+        encoded_fields[field] = json.encode(value)
+    end
+
+    local v = this.npc_ref_id_to_npc_data_version[ref_id]
+    if v == nil then
+        if this.npc_data_version_count >= this.max_npc_data_version_count then
+            this.evict_npc_data_versions()
+        end
+
+        v = {
+            used_at = 0,
+            version = nil,
+            previous_version = nil,
+            encoded_fields = {},
+            changed_fields = {},
+            removed_fields = {}
+        }
+        this.npc_ref_id_to_npc_data_version[ref_id] = v
+        this.npc_data_version_count = this.npc_data_version_count + 1
+    end
+
+    this.npc_data_version_tick = this.npc_data_version_tick + 1
+    v.used_at = this.npc_data_version_tick
+
+    local changed_fields = {}
+    local has_changes = false
+    for field, encoded in pairs(encoded_fields) do
+        if v.encoded_fields[field] ~= encoded then
+            changed_fields[field] = npc_data[field]
+            has_changes = true
+        end
+    end
+
+    local removed_fields = {}
+    for field, _ in pairs(v.encoded_fields) do
+        if encoded_fields[field] == nil then
+            table.insert(removed_fields, field)
+            has_changes = true
+        end
+    end
+
+    if has_changes or v.version == nil then
+        this.npc_data_version_counter = this.npc_data_version_counter + 1
+        v.previous_version = v.version
+        v.version = this.npc_data_epoch .. "." .. tostring(this.npc_data_version_counter)
+        v.encoded_fields = encoded_fields
+        v.changed_fields = changed_fields
+        v.removed_fields = removed_fields
+    end
+
+    if known_version == v.version then
+        return {
+            ref_id = ref_id,
+            version = v.version,
+            base_version = v.version
+        }
+    elseif known_version ~= nil and known_version == v.previous_version then
+        local has_changed_fields = next(v.changed_fields) ~= nil
+        return {
+            ref_id = ref_id,
+            version = v.version,
+            base_version = v.previous_version,
+            -- dkjson encodes empty table as an array
+            changed_fields = has_changed_fields and v.changed_fields or nil,
+            removed_fields = v.removed_fields
+        }
+    else
+        return {
+            ref_id = ref_id,
+            version = v.version,
+            base_version = nil,
+            changed_fields = npc_data
+        }
+    end
+end
+
 return this
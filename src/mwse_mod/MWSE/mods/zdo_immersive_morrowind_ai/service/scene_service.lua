@@ -0,0 +1,50 @@
+local eventbus = require("zdo_immersive_morrowind_ai.common.eventbus")
+local util = require("zdo_immersive_morrowind_ai.common.util")
+
+local env_service = require("zdo_immersive_morrowind_ai.service.env_service")
+local npc_service = require("zdo_immersive_morrowind_ai.service.npc_service")
+local player_service = require("zdo_immersive_morrowind_ai.service.player_service")
+
+local this = {}
+
+function this.setup()
+    event.register("zdo_ai_rpg:event_from_server", function(e)
+        if e["data"]["type"] == "get_scene_snapshot_request" then
+            local scene_snapshot = this.get_scene_snapshot(e["data"]["radius_ingame"], e["data"]["test_line_of_sight"],
+                e["data"]["known_npc_data_versions"] or {})
+            scene_snapshot.type = "get_scene_snapshot_response"
+
+            eventbus.produce_response_event(e, {
+                data = scene_snapshot
+            })
+        end
+    end, {
+        unregisterOnLoad = false
+    })
+end
+
+function this.get_scene_snapshot(radius_ingame, test_line_of_sight, known_npc_data_versions)
+    local actors = npc_service.get_actors_nearby(nil, radius_ingame, test_line_of_sight)
+
+    local npc_data_updates = {}
+    for _, actor in pairs(actors) do
+        if actor.actor_ref.type == 'npc' then
+            local ref_id = actor.actor_ref.ref_id
+            local npc_data_update = npc_service.get_npc_data_update(ref_id, known_npc_data_versions[ref_id])
+            if npc_data_update ~= nil then
+                table.insert(npc_data_updates, npc_data_update)
+            end
+        end
+    end
+
+    util.debug("Scene snapshot: %d actors, %d npcs", #actors, #npc_data_updates)
+
+    return {
+        actors = actors,
+        npc_data_updates = npc_data_updates,
+        env_data = env_service.get_env_data(),
+        player_data_fast = player_service.get_player_data_fast()
+    }
+end
+
+return this
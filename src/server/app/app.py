@@ -61,7 +61,7 @@ class App:
         Logger.setup_logs(config.log)
 
         llm = LlmSystem(config.llm)
-        llm_session = llm.create_session()
+        llm_session = llm.create_session('npc_response')
 
         parsed_log = LlmLogger.parse(args.llm_probe)
 
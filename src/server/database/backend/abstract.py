@@ -0,0 +1,35 @@
+import threading
+from abc import ABC, abstractmethod
+
+
+class DatabaseWrite:
+    # None means only appends are written on top of what is stored.
+    text: str | None
+    appended: list[str]
+    deleted: bool
+    # Set by the backend once the write is stored.
+    written: bool
+
+    def __init__(self, text: str | None, deleted: bool = False):
+        self.text = text
+        self.appended = []
+        self.deleted = deleted
+        self.written = False
+
+
+class AbstractDatabaseBackend(ABC):
+    # Keys are relative paths with '/' separators, e.g. 'npc/fargoth/behavior.yml'.
+
+    def __init__(self) -> None:
+        # Held while appends are stored and marked written, so readers never see them half-written.
+        # Never held during fsync, so readers wait for it only briefly.
+        self.append_lock = threading.Lock()
+
+    @abstractmethod
+    def read(self, key: str) -> str | None:
+        pass
+
+    # Called from a background thread while reads continue, returns writes which have failed.
+    @abstractmethod
+    def write(self, writes: dict[str, DatabaseWrite]) -> dict[str, DatabaseWrite]:
+        pass
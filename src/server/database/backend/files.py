@@ -0,0 +1,63 @@
+import os
+from database.backend.abstract import AbstractDatabaseBackend, DatabaseWrite
+from util.logger import Logger
+
+logger = Logger(__name__)
+
+
+class FilesDatabaseBackend(AbstractDatabaseBackend):
+    def __init__(self, root_dir: str) -> None:
+        super().__init__()
+        self._root_dir = root_dir
+
+    def read(self, key: str) -> str | None:
+        filepath = self._get_filepath(key)
+        if not os.path.exists(filepath):
+            return None
+
+        f = open(filepath, 'r', encoding='utf-8')
+        text = f.read()
+        f.close()
+        return text
+
+    def write(self, writes: dict[str, DatabaseWrite]) -> dict[str, DatabaseWrite]:
+        failed_writes: dict[str, DatabaseWrite] = {}
+        for key, write in writes.items():
+            try:
+                if write.text is None and not write.deleted:
+                    with self.append_lock:
+                        self._write_file(self._get_filepath(key), write)
+                        write.written = True
+                else:
+                    self._write_file(self._get_filepath(key), write)
+                    write.written = True
+            except Exception as error:
+                logger.error(f"Failed to write {key}: {error}")
+                failed_writes[key] = write
+        return failed_writes
+
+    def _get_filepath(self, key: str) -> str:
+        return os.path.join(self._root_dir, *key.split('/'))
+
+    def _write_file(self, filepath: str, write: DatabaseWrite) -> None:
+        if write.deleted:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            return
+
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        if write.text is None:
+            f = open(filepath, 'a', encoding='utf-8')
+            f.write(''.join(write.appended))
+            f.close()
+            return
+
+        # Written next to the target and renamed over it, so a crash never leaves a torn file.
+        tmp_filepath = filepath + '.tmp'
+        f = open(tmp_filepath, 'w', encoding='utf-8')
+        f.write(write.text)
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(tmp_filepath, filepath)
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+from database.backend.abstract import AbstractDatabaseBackend, DatabaseWrite
+from util.logger import Logger
+
+logger = Logger(__name__)
+
+
+class SqliteDatabaseBackend(AbstractDatabaseBackend):
+    def __init__(self, root_dir: str) -> None:
+        super().__init__()
+        self._root_dir = root_dir
+
+        filepath = os.path.join(self._root_dir, 'database.sqlite3')
+        logger.info(f"SQLite database is {filepath}")
+
+        # Writes come from a background thread, Database never runs two flushes at once.
+        self._connection = sqlite3.connect(filepath, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+        if self._get_meta('migrated_from_files') is None:
+            self._migrate_from_files()
+
+        # With WAL reads on a separate connection see the last commit and don't wait for the running one.
+        self._read_connection = sqlite3.connect(filepath, check_same_thread=False, isolation_level=None)
+
+    def read(self, key: str) -> str | None:
+        document = self._read_connection.execute("SELECT content FROM documents WHERE key = ?", (key,)).fetchone()
+        appends = self._read_connection.execute(
+            "SELECT content FROM document_appends WHERE key = ? ORDER BY seq", (key,)).fetchall()
+
+        if document is None and len(appends) == 0:
+            return None
+
+        text: str = document[0] if document else ''
+        return text + ''.join(map(lambda a: a[0], appends))
+
+    def write(self, writes: dict[str, DatabaseWrite]) -> dict[str, DatabaseWrite]:
+        # All writes of a flush are one transaction, e.g. stories of every NPC who heard the same line.
+        try:
+            self._connection.execute("BEGIN")
+            for key, write in writes.items():
+                self._write(key, write)
+            # synchronous=NORMAL doesn't fsync on commit in WAL mode, so the lock is held briefly.
+            with self.append_lock:
+                self._connection.execute("COMMIT")
+                for write in writes.values():
+                    write.written = True
+            return {}
+        except Exception as error:
+            logger.error(f"Failed to write {len(writes)} documents: {error}")
+            self._connection.execute("ROLLBACK")
+            return writes
+
+    def _write(self, key: str, write: DatabaseWrite):
+        if write.deleted:
+            self._connection.execute("DELETE FROM document_appends WHERE key = ?", (key,))
+            self._connection.execute("DELETE FROM documents WHERE key = ?", (key,))
+            return
+
+        if write.text is not None:
+            self._connection.execute("DELETE FROM document_appends WHERE key = ?", (key,))
+            self._connection.execute(
+                "INSERT INTO documents (key, content) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET content = excluded.content",
+                (key, write.text))
+
+        self._connection.executemany(
+            "INSERT INTO document_appends (key, content) VALUES (?, ?)",
+            map(lambda a: (key, a), write.appended))
+
+    def _create_tables(self):
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS document_appends (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                content TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS document_appends_key ON document_appends (key, seq);
+        """)
+
+    def _get_meta(self, name: str) -> str | None:
+        row = self._connection.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _migrate_from_files(self):
+        writes: dict[str, DatabaseWrite] = {}
+        for dirpath, _, filenames in os.walk(self._root_dir):
+            for filename in filenames:
+                if not filename.endswith(('.yml', '.json', '.jsonl', '.txt')):
+                    continue
+
+                filepath = os.path.join(dirpath, filename)
+                key = os.path.relpath(filepath, self._root_dir).replace(os.sep, '/')
+
+                f = open(filepath, 'r', encoding='utf-8')
+                writes[key] = DatabaseWrite(f.read())
+                f.close()
+
+        logger.info(f"Migrating {len(writes)} files from {self._root_dir} to SQLite")
+
+        self._connection.execute("BEGIN")
+        for key, write in writes.items():
+            self._write(key, write)
+        self._connection.execute("INSERT INTO meta (name, value) VALUES ('migrated_from_files', '1')")
+        self._connection.execute("COMMIT")
@@ -1,15 +1,36 @@
+import asyncio
+import atexit
+import threading
 from util.logger import Logger
 import os
-from pydantic import BaseModel
-import yaml
+from typing import Literal, Sequence
+from pydantic import BaseModel, Field
 from pathvalidate import sanitize_filename
+from database.backend.abstract import AbstractDatabaseBackend, DatabaseWrite
+from database.backend.files import FilesDatabaseBackend
+from database.backend.sqlite import SqliteDatabaseBackend
+from database.serializer import AbstractModelSerializer, JsonModelSerializer, YamlModelSerializer
 
 logger = Logger(__name__)
 
+
 class Database:
     class Config(BaseModel):
         directory: str
 
+        # files: a YAML/JSONL file per NPC per aspect under the directory.
+        # sqlite: a single SQLite file in the same place, existing files are imported on first start.
+        backend: Literal['files', 'sqlite'] = Field(default='files')
+
+        # Format of newly saved models, models saved in the other format are still loaded
+        # and the other format file is deleted on their next save.
+        # json is much faster to save and load, yaml is easier to read and edit by hand.
+        model_format: Literal['json', 'yaml'] = Field(default='json')
+
+        # Saves are kept in memory and written to disk in background this often,
+        # repeated saves of the same file in between are written once.
+        flush_interval_sec: float = Field(default=1.0)
+
     def __init__(self, config: Config, player_name: str) -> None:
         self._config = config
 
@@ -18,60 +39,203 @@ class Database:
 
         os.makedirs(self._root_dir, exist_ok=True)
 
+        self._backend = self._create_backend()
+
+        self._serializers: list[AbstractModelSerializer] = [JsonModelSerializer(), YamlModelSerializer()]
+        if self._config.model_format == 'yaml':
+            self._serializers.reverse()
+
+        self._pending_writes: dict[str, DatabaseWrite] = {}
+        # Model keys whose files in the other formats are already deleted.
+        self._keys_without_other_formats: set[str] = set()
+        # Writes taken by the flush which is being written right now, loads read them without waiting for the disk.
+        self._in_flight_writes: dict[str, DatabaseWrite] = {}
+        self._pending_writes_lock = threading.Lock()
+        # Held while writes are being written, only one flush runs at a time.
+        self._flush_lock = threading.Lock()
+
+        asyncio.get_event_loop().create_task(self._flush_loop())
+        atexit.register(self.flush)
+
     def save_model(self, *, path: list[str], value: BaseModel) -> None:
-        d = value.model_dump(mode='json')
-        text = yaml.dump(d, allow_unicode=True)
+        serializer = self._serializers[0]
+        key = self._get_key(path, serializer.file_ext)
+        self._save(key, serializer.dump(value))
+
+        # Otherwise a stale file in the other format could be loaded instead, e.g. after model_format is changed.
+        if key not in self._keys_without_other_formats:
+            for other_serializer in self._serializers[1:]:
+                self._delete(self._get_key(path, other_serializer.file_ext))
+            self._keys_without_other_formats.add(key)
+
+    def save_models(self, *, path: list[str], values: Sequence[BaseModel]) -> None:
+        key = self._get_key_models(path)
+        self._save(key, ''.join(map(self._model_to_line, values)))
 
-        filepath = self._get_filepath_model(path)
-        self._save(filepath, text)
+    def append_models(self, *, path: list[str], values: Sequence[BaseModel]) -> None:
+        key = self._get_key_models(path)
+        self._append(key, ''.join(map(self._model_to_line, values)))
 
     def save_text(self, *, path: list[str], text: str) -> None:
-        filepath = self._get_filepath_text(path)
-        self._save(filepath, text)
+        key = self._get_key_text(path)
+        self._save(key, text)
 
     def load_model[T: BaseModel](self, *, type: type[T], path: list[str] = []) -> T | None:
-        filepath = self._get_filepath_model(path)
-        if not os.path.exists(filepath):
-            logger.debug(f"File is absent for model at {filepath}")
+        for serializer in self._serializers:
+            key = self._get_key(path, serializer.file_ext)
+            text = self._load(key)
+            if text is not None:
+                return serializer.load(type, text)
+
+        logger.debug(f"File is absent for model at {path}")
+        return None
+
+    def load_models[T: BaseModel](self, *, type: type[T], path: list[str] = []) -> list[T] | None:
+        loaded = self.load_last_models(type=type, path=path, last=None)
+        return loaded[0] if loaded else None
+
+    # Returns the last models and the number of lines stored, the whole file is read once.
+    def load_last_models[T: BaseModel](self, *, type: type[T], path: list[str] = [], last: int | None) -> tuple[list[T], int] | None:
+        key = self._get_key_models(path)
+        text = self._load(key)
+        if text is None:
+            logger.debug(f"File is absent for models at {key}")
             return None
 
-        text = self._load(filepath)
-        d = yaml.safe_load(text)
-        return type.model_validate(d)
+        lines = text.splitlines()
+        line_count = len(lines)
+        if last is not None:
+            # Only the tail is parsed.
+            lines = lines[-last:] if last > 0 else []
+
+        values: list[T] = []
+        for line in lines:
+            if len(line) == 0:
+                continue
+
+            try:
+                values.append(type.model_validate_json(line))
+            except Exception as error:
+                # Last line may be torn if the game or server crashed while appending.
+                logger.warning(f"Skipping broken line in {key}: {error}")
+
+        return values, line_count
+
+    def delete_model(self, *, path: list[str]) -> None:
+        for serializer in self._serializers:
+            self._delete(self._get_key(path, serializer.file_ext))
 
     def load_text(self, *, path: list[str] = []) -> str | None:
-        filepath = self._get_filepath_text(path)
-        if not os.path.exists(filepath):
-            logger.debug(f"File is absent for text at {filepath}")
+        key = self._get_key_text(path)
+        text = self._load(key)
+        if text is None:
+            logger.debug(f"File is absent for text at {key}")
             return None
 
-        return self._load(filepath)
+        return text
 
-    def _get_filepath(self, path: list[str], file_ext: str):
-        if len(path) == 0:
-            raise Exception(f"Path must contain at least file name")
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._pending_writes_lock:
+                writes = self._pending_writes
+                self._pending_writes = {}
+                self._in_flight_writes = writes
+
+            if len(writes) == 0:
+                return
 
-        path_without_file = path[:-1]
+            failed_writes = self._backend.write(writes)
 
-        full_dir = os.path.join(self._root_dir, *path_without_file)
-        os.makedirs(full_dir, exist_ok=True)
+            with self._pending_writes_lock:
+                # Callers already consider them saved, so they are retried on the next flush.
+                for key, failed_write in failed_writes.items():
+                    newer_write = self._pending_writes.get(key, None)
+                    self._pending_writes[key] = self._merge_writes(failed_write, newer_write) if newer_write else failed_write
+                self._in_flight_writes = {}
 
-        full_path = os.path.join(full_dir, f"{sanitize_filename(path[-1])}.{file_ext}")
-        return full_path
+            logger.debug(f"Flushed {len(writes) - len(failed_writes)} files to disk")
 
-    def _get_filepath_model(self, path: list[str]):
-        return self._get_filepath(path, 'yml')
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self._config.flush_interval_sec)
+            await asyncio.get_event_loop().run_in_executor(None, self.flush)
 
-    def _get_filepath_text(self, path: list[str]):
-        return self._get_filepath(path, 'txt')
+    def _create_backend(self) -> AbstractDatabaseBackend:
+        if self._config.backend == 'sqlite':
+            return SqliteDatabaseBackend(self._root_dir)
+        return FilesDatabaseBackend(self._root_dir)
 
-    def _save(self, filepath: str, text: str) -> None:
-        f = open(filepath, 'w', encoding='utf-8')
-        f.write(text)
-        f.close()
+    def _get_key(self, path: list[str], file_ext: str):
+        if len(path) == 0:
+            raise Exception(f"Path must contain at least file name")
 
-    def _load(self, filepath: str) -> str:
-        f = open(filepath, 'r', encoding='utf-8')
-        c = f.read()
-        f.close()
-        return c
+        return '/'.join([*path[:-1], f"{sanitize_filename(path[-1])}.{file_ext}"])
+
+    def _get_key_text(self, path: list[str]):
+        return self._get_key(path, 'txt')
+
+    def _get_key_models(self, path: list[str]):
+        return self._get_key(path, 'jsonl')
+
+    def _model_to_line(self, value: BaseModel) -> str:
+        return value.model_dump_json() + "\n"
+
+    def _save(self, key: str, text: str) -> None:
+        with self._pending_writes_lock:
+            self._pending_writes[key] = DatabaseWrite(text)
+
+    def _delete(self, key: str) -> None:
+        with self._pending_writes_lock:
+            self._pending_writes[key] = DatabaseWrite(None, deleted=True)
+
+    def _append(self, key: str, text: str) -> None:
+        appended_write = DatabaseWrite(None)
+        appended_write.appended.append(text)
+
+        with self._pending_writes_lock:
+            pending_write = self._pending_writes.get(key, None)
+            self._pending_writes[key] = self._merge_writes(pending_write, appended_write) if pending_write else appended_write
+
+    def _merge_writes(self, older: DatabaseWrite, newer: DatabaseWrite) -> DatabaseWrite:
+        if newer.deleted or newer.text is not None:
+            return newer
+
+        if older.deleted:
+            return DatabaseWrite(''.join(newer.appended))
+        elif older.text is None:
+            older.appended.extend(newer.appended)
+        else:
+            older.text += ''.join(newer.appended)
+        return older
+
+    def _load(self, key: str) -> str | None:
+        with self._pending_writes_lock:
+            in_flight_write = self._in_flight_writes.get(key, None)
+            writes = [w for w in [in_flight_write, self._pending_writes.get(key, None)] if w]
+            text: str | None = None
+            is_text_known = False
+            appended = ''
+            for write in writes:
+                if write.deleted:
+                    text, is_text_known, appended = None, True, ''
+                elif write.text is not None:
+                    text, is_text_known, appended = write.text, True, ''.join(write.appended)
+                else:
+                    appended += ''.join(write.appended)
+
+        if is_text_known:
+            # Appends after a delete start the file over.
+            return (text or '') + appended if text is not None or len(appended) > 0 else None
+
+        if in_flight_write is not None:
+            # Only appends are in flight, the backend has either all or none of them while the lock is held.
+            with self._backend.append_lock:
+                text = self._backend.read(key)
+                if in_flight_write.written:
+                    appended = appended[len(''.join(in_flight_write.appended)):]
+            return (text or '') + appended
+
+        text = self._backend.read(key)
+        if len(writes) > 0:
+            return (text or '') + appended
+        return text
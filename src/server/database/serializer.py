@@ -0,0 +1,46 @@
+from abc import ABC, abstractmethod
+from pydantic import BaseModel
+import yaml
+
+# libyaml bindings are several times faster, pure Python ones are used if PyYAML is built without them.
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_YamlDumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+class AbstractModelSerializer(ABC):
+    @property
+    @abstractmethod
+    def file_ext(self) -> str:
+        pass
+
+    @abstractmethod
+    def dump(self, value: BaseModel) -> str:
+        pass
+
+    @abstractmethod
+    def load[T: BaseModel](self, type: type[T], text: str) -> T:
+        pass
+
+
+class JsonModelSerializer(AbstractModelSerializer):
+    @property
+    def file_ext(self) -> str:
+        return 'json'
+
+    def dump(self, value: BaseModel) -> str:
+        return value.model_dump_json(indent=2)
+
+    def load[T: BaseModel](self, type: type[T], text: str) -> T:
+        return type.model_validate_json(text)
+
+
+class YamlModelSerializer(AbstractModelSerializer):
+    @property
+    def file_ext(self) -> str:
+        return 'yml'
+
+    def dump(self, value: BaseModel) -> str:
+        return yaml.dump(value.model_dump(mode='json'), Dumper=_YamlDumper, allow_unicode=True)
+
+    def load[T: BaseModel](self, type: type[T], text: str) -> T:
+        return type.model_validate(yaml.load(text, Loader=_YamlLoader))
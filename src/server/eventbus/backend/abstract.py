@@ -1,15 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Callable
+from typing import Any, Callable, Coroutine
 from eventbus.event import Event
 
 
 class AbstractEventBusBackend(ABC):
     @abstractmethod
-    def start(self, callback: Callable[[Event], None]):
+    def start(self, callback: Callable[[Event], Coroutine[Any, Any, None]]):
         pass
 
     @abstractmethod
-    def publish_event_to_game(self, event: Event):
+    async def publish_event_to_game(self, event: Event):
         pass
 
     @abstractmethod
@@ -1,58 +1,160 @@
 import asyncio
+import codecs
 from util.logger import Logger
 import struct
-from typing import Callable
+from typing import Any, Callable, Coroutine, Literal
 
-from pydantic import BaseModel
+import msgpack  # type: ignore
+from pydantic import BaseModel, Field
 from eventbus.backend.abstract import AbstractEventBusBackend
 from eventbus.event import Event
 
 logger = Logger(__name__)
 
+# Highest bit of the frame size marks a msgpack body, JSON otherwise.
+_MSGPACK_FRAME_FLAG = 0x80000000
+
 
 class _ActiveClient:
     peer_name: str
     writer: asyncio.StreamWriter
+    supports_msgpack: bool
+
+    pending_frames: list[bytes]
+    # Includes frames which are being written right now, until the game has read them.
+    pending_bytes: int
+    has_pending_frames: asyncio.Event
+    closed: bool
 
     def __init__(self, peer_name: str, writer: asyncio.StreamWriter):
         self.peer_name = peer_name
         self.writer = writer
+        self.supports_msgpack = False
+
+        self.pending_frames = []
+        self.pending_bytes = 0
+        self.has_pending_frames = asyncio.Event()
+        self.closed = False
 
 class MwseTcpEventBusBackend(AbstractEventBusBackend):
     class Config(BaseModel):
         port: int
         encoding: str
 
+        # msgpack is sent only to clients which have sent msgpack themselves.
+        wire_format: Literal['json', 'msgpack'] = Field(default='json')
+
+        # A client with more than this waiting to be sent has stalled, it is disconnected and the game reconnects.
+        # Publishing never waits for a client, so one stalled client doesn't hold up the others.
+        send_buffer_max_bytes: int = Field(default=1_000_000)
+
     def __init__(self, config: Config) -> None:
         super().__init__()
 
         self._config = config
-        self._callback_for_event_from_game: Callable[[Event], None]
+        self._callback_for_event_from_game: Callable[[Event], Coroutine[Any, Any, None]]
 
         self._active_clients: list[_ActiveClient] = []
 
+        # msgpack can't decode strings with a custom encoding, so non-utf8 strings are converted manually.
+        self._is_utf8_encoding = codecs.lookup(self._config.encoding).name == 'utf-8'
+
     def is_connected_to_game(self) -> bool:
         return len(self._active_clients) > 0
 
-    def start(self, callback: Callable[[Event], None]):
+    def start(self, callback: Callable[[Event], Coroutine[Any, Any, None]]):
         self._callback_for_event_from_game = callback
 
         asyncio.get_event_loop().create_task(self._run_server())
 
-    def publish_event_to_game(self, event: Event):
-        for client in self._active_clients:
+    async def publish_event_to_game(self, event: Event):
+        for client in list(self._active_clients):
             try:
-                self._publish_event_to_client(client, event)
+                await self._publish_event_to_client(client, event)
             except Exception as error:
                 logger.error(f"Falied to publish event to client {client.peer_name}: {error}")
 
-    def _publish_event_to_client(self, client: _ActiveClient, event: Event):
-        msg_json_str = event.model_dump_json()
-        msg_bytes = msg_json_str.encode(encoding=self._config.encoding)
+    async def _publish_event_to_client(self, client: _ActiveClient, event: Event):
+        if client.closed:
+            return
+
+        frame = self._frame_event(client, event)
+
+        if client.pending_bytes + len(frame) > self._config.send_buffer_max_bytes:
+            logger.error(f"Client {client.peer_name} has {client.pending_bytes} bytes not read, disconnecting it")
+            client.closed = True
+            # close() would wait until the game reads what is buffered.
+            client.writer.transport.abort()
+            return
+
+        client.pending_frames.append(frame)
+        client.pending_bytes += len(frame)
+        client.has_pending_frames.set()
+
+    def _frame_event(self, client: _ActiveClient, event: Event) -> bytes:
+        if self._config.wire_format == 'msgpack' and client.supports_msgpack:
+            msg_bytes = self._pack_msgpack(event.model_dump(mode='json'))
+            header = struct.pack('>I', len(msg_bytes) | _MSGPACK_FRAME_FLAG)
+        else:
+            msg_json_str = event.model_dump_json()
+            msg_bytes = msg_json_str.encode(encoding=self._config.encoding)
+            header = struct.pack('>I', len(msg_bytes))
 
-        header = struct.pack('>I', len(msg_bytes))
-        client.writer.write(header)
-        client.writer.write(msg_bytes)
+        return header + msg_bytes
+
+    async def _write_to_client(self, client: _ActiveClient):
+        try:
+            while True:
+                await client.has_pending_frames.wait()
+                client.has_pending_frames.clear()
+
+                # Everything queued while the previous batch was draining goes out in one write.
+                frames = client.pending_frames
+                client.pending_frames = []
+
+                # writelines() of Python 3.12 doesn't pause the protocol, so drain() would never wait.
+                client.writer.write(b''.join(frames))
+                await client.writer.drain()
+                client.pending_bytes -= sum(map(len, frames))
+        except Exception as error:
+            logger.error(f"Error happened during writing to the client {client.peer_name}: {error}")
+
+    def _parse_event(self, client: _ActiveClient, msg_bytes: bytes, is_msgpack: bool) -> Event:
+        if is_msgpack:
+            client.supports_msgpack = True
+            # Strict python mode would reject msgpack arrays for tuple fields, JSON mode accepts them.
+            return Event.model_validate(self._unpack_msgpack(msg_bytes), strict=False)
+        else:
+            msg = msg_bytes.decode(encoding=self._config.encoding)
+            return Event.model_validate_json(msg, strict=True)
+
+    def _pack_msgpack(self, obj: Any) -> bytes:
+        if self._is_utf8_encoding:
+            return msgpack.packb(obj)
+        return msgpack.packb(self._encode_strings(obj), use_bin_type=False)
+
+    def _unpack_msgpack(self, msg_bytes: bytes) -> Any:
+        if self._is_utf8_encoding:
+            return msgpack.unpackb(msg_bytes)
+        return self._decode_strings(msgpack.unpackb(msg_bytes, raw=True))
+
+    def _encode_strings(self, obj: Any) -> Any:
+        if isinstance(obj, str):
+            return obj.encode(encoding=self._config.encoding)
+        elif isinstance(obj, dict):
+            return {self._encode_strings(k): self._encode_strings(v) for k, v in obj.items()}
+        elif isinstance(obj, list):
+            return [self._encode_strings(v) for v in obj]
+        return obj
+
+    def _decode_strings(self, obj: Any) -> Any:
+        if isinstance(obj, bytes):
+            return obj.decode(encoding=self._config.encoding)
+        elif isinstance(obj, dict):
+            return {self._decode_strings(k): self._decode_strings(v) for k, v in obj.items()}
+        elif isinstance(obj, list):
+            return [self._decode_strings(v) for v in obj]
+        return obj
 
     async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         peername = writer.get_extra_info("peername")
@@ -64,24 +166,34 @@ class MwseTcpEventBusBackend(AbstractEventBusBackend):
         logger.info(f"Client #{client.peer_name} connected")
         self._active_clients.append(client)
 
+        writer_task = asyncio.get_event_loop().create_task(self._write_to_client(client))
+
         try:
             while True:
                 msg_size_bytes = await reader.readexactly(4)
-                msg_size: int = struct.unpack('>I', msg_size_bytes)[0]
+                msg_header: int = struct.unpack('>I', msg_size_bytes)[0]
+                is_msgpack = (msg_header & _MSGPACK_FRAME_FLAG) != 0
+                msg_size = msg_header & ~_MSGPACK_FRAME_FLAG
 
                 msg_bytes = await reader.readexactly(msg_size)
-                msg = msg_bytes.decode(encoding=self._config.encoding)
 
                 try:
-                    event = Event.model_validate_json(msg, strict=True)
+                    event = self._parse_event(client, msg_bytes, is_msgpack)
                     logger.debug(event)
-                    self._callback_for_event_from_game(event)
                 except Exception as error:
-                    logger.error(f"Error happened during event deserialization: {msg} {error}")
+                    logger.error(f"Error happened during event deserialization: {msg_bytes!r} {error}")
+                    continue
+
+                # Not reading the socket while the bus is full lets TCP push back on the game.
+                await self._callback_for_event_from_game(event)
         except Exception as error:
             logger.error(f"Error happened during serving the client: {error}")
         finally:
             self._active_clients.remove(client)
+
+            client.closed = True
+            writer_task.cancel()
+
             writer.close()
 
     async def _run_server(self):
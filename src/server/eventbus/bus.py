@@ -1,18 +1,49 @@
 import asyncio
+import threading
 from util.logger import Logger
 import traceback
-from typing import Any, Callable, Coroutine, List, Literal
+from typing import Any, Callable, Coroutine, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from eventbus.backend.abstract import AbstractEventBusBackend
 from eventbus.backend.mwse_tcp import MwseTcpEventBusBackend
 from eventbus.event import Event
 from eventbus.event_consumer import EventConsumer
 from eventbus.event_producer import EventProducer
+from util.now_ms import now_ms
 
 logger = Logger(__name__)
 
 
+class _Subscriber:
+    handler: Callable[[Event], Coroutine[Any, Any, None]]
+    name: str
+    queue: asyncio.Queue[tuple[Event, int]]
+
+    handled_count: int
+    total_latency_ms: int
+    max_latency_ms: int
+
+    def __init__(self, handler: Callable[[Event], Coroutine[Any, Any, None]], queue_max_size: int):
+        self.handler = handler
+        self.name = getattr(handler, '__qualname__', repr(handler))
+        self.queue = asyncio.Queue(maxsize=queue_max_size)
+
+        self.handled_count = 0
+        self.total_latency_ms = 0
+        self.max_latency_ms = 0
+
+
+
+def _get_coalescing_key(event: Event) -> str | None:
+    # Events with the same key supersede each other, only the latest one still queued is sent to the game.
+    if event.data.type == 'stt_recognition_update':
+        return 'stt_recognition_update'
+    elif event.data.type == 'turn_actors_to':
+        return f"turn_actors_to:{','.join(sorted(event.data.actor_ref_ids))}"
+    return None
+
+
 class EventBus(EventProducer, EventConsumer):
     class Config(BaseModel):
         class MwseTcp(BaseModel):
@@ -23,23 +54,51 @@ class EventBus(EventProducer, EventConsumer):
         producers: int
         consumers: int
 
+        # Max events waiting in each direction. When the queue from the game is full,
+        # reading from the game socket pauses until consumers catch up.
+        queue_max_size: int = Field(default=1000)
+
+        # sequential: every event is passed to all handlers one after another, consumers handle several events at once.
+        # concurrent: each handler has its own queue and task, so a slow handler delays only its own events,
+        # but it also handles only one event at a time and handlers of the same event are not ordered anymore.
+        dispatch_mode: Literal['sequential', 'concurrent'] = Field(default='sequential')
+
     def __init__(self, config: Config):
         self._config = config
 
         self._next_event_id = 1
 
         self._backend = self._create_backend()
-        self._handlers: List[Callable[[Event], Coroutine[Any, Any, None]]] = []
+        self._subscribers: list[_Subscriber] = []
+        self._subscribers_to_all_events: list[_Subscriber] = []
+        self._event_type_to_subscribers: dict[str, list[_Subscriber]] = {}
+        self._slow_handler_ms = 1_000
+        self._handler_latency_report_interval_sec = 60
+
+        self._events_to_produce_to_game = asyncio.Queue[Event](maxsize=self._config.queue_max_size)
+        self._events_consumed_from_game = asyncio.Queue[Event](maxsize=self._config.queue_max_size)
+
+        self._coalescing_key_to_latest_event_id: dict[str, int] = {}
+        self._coalesced_events_count = 0
 
-        self._events_to_produce_to_game: list[Event] = []
-        self._events_consumed_from_game: list[Event] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
 
     def start(self):
+        self._loop = asyncio.get_event_loop()
+        self._loop_thread_id = threading.get_ident()
+
         for _ in range(0, self._config.producers):
-            asyncio.get_event_loop().create_task(self._producer())
+            self._loop.create_task(self._producer())
 
         for _ in range(0, self._config.consumers):
-            asyncio.get_event_loop().create_task(self._consumer())
+            self._loop.create_task(self._consumer())
+
+        if self._config.dispatch_mode == 'concurrent':
+            for subscriber in self._subscribers:
+                self._loop.create_task(self._subscriber_worker(subscriber))
+
+        self._loop.create_task(self._report_handler_latency())
 
         self._backend.start(self._handle_event_from_game)
 
@@ -51,54 +110,139 @@ class EventBus(EventProducer, EventConsumer):
 
     async def _consumer(self):
         while True:
-            processed = False
+            event = await self._events_consumed_from_game.get()
+            Logger.set_ctx(f"consumer_event:{event.event_id}")
 
-            if len(self._events_consumed_from_game) > 0:
-                processed = True
-                event = self._events_consumed_from_game.pop(0)
-                Logger.set_ctx(f"consumer_event:{event.event_id}")
-
-                for h in self._handlers:
-                    try:
-                        await h(event)
-                    except Exception as error:
-                        logger.error(f"Consumer handler failed: event={event} error={error}")
-                        logger.debug(traceback.format_exc())
-
-            if not processed:
-                await asyncio.sleep(1.0 / 30.0)
+            try:
+                await self._dispatch(event)
+            finally:
+                self._events_consumed_from_game.task_done()
 
     async def _producer(self):
         while True:
-            processed = False
+            event = await self._events_to_produce_to_game.get()
+            Logger.set_ctx(f"produce_event:{event.event_id}")
+
+            try:
+                if self._is_superseded(event):
+                    continue
 
-            if len(self._events_to_produce_to_game) > 0:
-                processed = True
-                event = self._events_to_produce_to_game.pop(0)
-                Logger.set_ctx(f"produce_event:{event.event_id}")
+                await self._backend.publish_event_to_game(event)
+                await self._dispatch(event)
+            finally:
+                self._events_to_produce_to_game.task_done()
 
-                self._backend.publish_event_to_game(event)
+    async def _handle_event_from_game(self, event: Event):
+        logger.debug(f"> from game: {event}")
 
-                for h in self._handlers:
-                    try:
-                        await h(event)
-                    except Exception as error:
-                        logger.error(f"Handler failed: event={event} error={error}")
-                        logger.debug(traceback.format_exc())
+        if self._events_consumed_from_game.full():
+            logger.warning(f"Queue of events from game is full ({self._config.queue_max_size}), waiting for consumers")
 
-            if not processed:
-                await asyncio.sleep(1.0 / 30.0)
+        await self._events_consumed_from_game.put(event)
 
-    def _handle_event_from_game(self, event: Event):
-        logger.debug(f"> from game: {event}")
-        self._events_consumed_from_game.append(event)
+    async def _dispatch(self, event: Event):
+        dispatched_at_ms = now_ms()
+
+        subscribers = self._event_type_to_subscribers.get(event.data.type, self._subscribers_to_all_events)
+        for subscriber in subscribers:
+            if self._config.dispatch_mode == 'concurrent':
+                if subscriber.queue.full():
+                    logger.warning(f"Queue of handler {subscriber.name} is full ({self._config.queue_max_size}), waiting for it")
+                await subscriber.queue.put((event, dispatched_at_ms))
+            else:
+                await self._run_handler(subscriber, event, dispatched_at_ms)
 
-    def register_handler(self, handler: Callable[[Event], Coroutine[Any, Any, None]]):
-        self._handlers.append(handler)
+    async def _subscriber_worker(self, subscriber: _Subscriber):
+        while True:
+            event, dispatched_at_ms = await subscriber.queue.get()
+            Logger.set_ctx(f"handle_event:{event.event_id}")
+
+            try:
+                await self._run_handler(subscriber, event, dispatched_at_ms)
+            finally:
+                subscriber.queue.task_done()
+
+    async def _run_handler(self, subscriber: _Subscriber, event: Event, dispatched_at_ms: int):
+        started_at_ms = now_ms()
+        try:
+            await subscriber.handler(event)
+        except Exception as error:
+            logger.error(f"Handler {subscriber.name} failed: event={event} error={error}")
+            logger.debug(traceback.format_exc())
+        finally:
+            handled_at_ms = now_ms()
+            latency_ms = handled_at_ms - dispatched_at_ms
+
+            subscriber.handled_count += 1
+            subscriber.total_latency_ms += latency_ms
+            subscriber.max_latency_ms = max(subscriber.max_latency_ms, latency_ms)
+
+            if handled_at_ms - started_at_ms > self._slow_handler_ms:
+                logger.warning(
+                    f"Handler {subscriber.name} took {handled_at_ms - started_at_ms}ms to handle {event.data.type}")
+
+    async def _report_handler_latency(self):
+        while True:
+            await asyncio.sleep(self._handler_latency_report_interval_sec)
+
+            for subscriber in self._subscribers:
+                if subscriber.handled_count == 0:
+                    continue
+
+                logger.debug(f"""Handler {subscriber.name}: handled={subscriber.handled_count} avg_latency={
+                    subscriber.total_latency_ms // subscriber.handled_count}ms max_latency={
+                    subscriber.max_latency_ms}ms queued={subscriber.queue.qsize()}""")
+
+    def register_handler(self, handler: Callable[[Event], Coroutine[Any, Any, None]], event_types: set[str] | None = None):
+        subscriber = _Subscriber(handler, self._config.queue_max_size)
+        self._subscribers.append(subscriber)
+
+        # Each event type has a ready list of its subscribers in registration order, including subscribers to all events.
+        if event_types is None:
+            self._subscribers_to_all_events.append(subscriber)
+            for subscribers in self._event_type_to_subscribers.values():
+                subscribers.append(subscriber)
+        else:
+            for event_type in event_types:
+                if event_type not in self._event_type_to_subscribers:
+                    self._event_type_to_subscribers[event_type] = list(self._subscribers_to_all_events)
+                self._event_type_to_subscribers[event_type].append(subscriber)
+
+        if self._loop and self._config.dispatch_mode == 'concurrent':
+            self._loop.create_task(self._subscriber_worker(subscriber))
 
     def produce_event(self, event: Event):
+        # STT backends and keyboard listeners produce events from their own threads.
+        if self._loop and threading.get_ident() != self._loop_thread_id:
+            self._loop.call_soon_threadsafe(self._enqueue_event_to_game, event)
+        else:
+            self._enqueue_event_to_game(event)
+
+    def _enqueue_event_to_game(self, event: Event):
         event.event_id = self._next_event_id
         self._next_event_id = self._next_event_id + 1
 
         logger.debug(f"> to game: {event}")
-        self._events_to_produce_to_game.append(event)
+        try:
+            self._events_to_produce_to_game.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.error(f"Queue of events to game is full ({self._config.queue_max_size}), dropping event: {event}")
+            return
+
+        coalescing_key = _get_coalescing_key(event)
+        if coalescing_key is not None:
+            self._coalescing_key_to_latest_event_id[coalescing_key] = event.event_id
+
+    def _is_superseded(self, event: Event) -> bool:
+        coalescing_key = _get_coalescing_key(event)
+        if coalescing_key is None:
+            return False
+
+        latest_event_id = self._coalescing_key_to_latest_event_id.get(coalescing_key, None)
+        if latest_event_id is not None and latest_event_id != event.event_id:
+            self._coalesced_events_count += 1
+            logger.debug(f"Event {event.event_id} is superseded by {latest_event_id}, total coalesced: {self._coalesced_events_count}")
+            return True
+
+        self._coalescing_key_to_latest_event_id.pop(coalescing_key, None)
+        return False
@@ -0,0 +1,10 @@
+from typing import Optional
+from pydantic import BaseModel
+
+from eventbus.data.actor_ref import ActorRef
+
+
+class ActorNearby(BaseModel):
+    actor_ref: ActorRef
+    distance_ingame: float
+    can_see: Optional[bool] = None
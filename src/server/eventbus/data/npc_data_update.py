@@ -0,0 +1,18 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+
+class NpcDataUpdate(BaseModel):
+    ref_id: str
+
+    # Opaque version assigned by the game, changes whenever any field of NpcData changes.
+    version: str
+
+    # None means changed_fields contain the full NpcData.
+    # Same as version means nothing has changed since the version known to the server.
+    # Otherwise changed_fields and removed_fields are the delta on top of base_version.
+    base_version: Optional[str] = Field(default=None)
+
+    changed_fields: Optional[dict[str, Any]] = Field(default=None)
+    removed_fields: list[str] = Field(default=[])
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+
+from eventbus.data.actor_nearby import ActorNearby
+from eventbus.data.env_data import EnvData
+from eventbus.data.npc_data import NpcData
+from eventbus.data.player_data_fast import PlayerDataFast
+
+
+class SceneSnapshot(BaseModel):
+    # Actors around the local player.
+    actors: list[ActorNearby]
+
+    # Data of NPCs from the actors list.
+    npc_data_list: list[NpcData]
+
+    env_data: EnvData
+    player_data_fast: PlayerDataFast
@@ -9,5 +9,6 @@ logger = Logger(__name__)
 
 class EventConsumer(ABC):
     @abstractmethod
-    def register_handler(self, handler: Callable[[Event], Coroutine[Any, Any, None]]):
+    def register_handler(self, handler: Callable[[Event], Coroutine[Any, Any, None]], event_types: set[str] | None = None):
+        # event_types=None subscribes the handler to all events
         pass
@@ -1,11 +1,12 @@
 from typing import Literal, Optional, Union
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from eventbus.data.npc_data import NpcData
 from eventbus.data.player_data import PlayerData
-from eventbus.data.actor_ref import ActorRef
+from eventbus.data.actor_nearby import ActorNearby
 from eventbus.data.env_data import EnvData
 from eventbus.data.player_data_fast import PlayerDataFast
+from eventbus.data.npc_data_update import NpcDataUpdate
 
 
 class EventDataRpc:
@@ -34,6 +35,20 @@ class EventDataRpc:
         type: Literal['get_npc_response']
         npc_data: NpcData
 
+    #
+    class GetNpcsRequest(BaseModel):
+        type: Literal['get_npcs_request']
+        npc_ref_ids: list[str]
+
+        # ref_id -> NpcDataUpdate.version the server already has.
+        known_npc_data_versions: dict[str, str]
+
+    class GetNpcsResponse(BaseModel):
+        type: Literal['get_npcs_response']
+
+        # Refs which cannot be found in the game are omitted.
+        npc_data_updates: list[NpcDataUpdate]
+
     #
     class GetActorsNearbyRequest(BaseModel):
         type: Literal['get_actors_nearby_request']
@@ -42,11 +57,6 @@ class EventDataRpc:
         test_line_of_sight: Optional[bool]
 
     class GetActorsNearbyResponse(BaseModel):
-        class ActorNearby(BaseModel):
-            actor_ref: ActorRef
-            distance_ingame: float
-            can_see: Optional[bool] = None
-
         type: Literal['get_actors_nearby_response']
         actors: list[ActorNearby]
 
@@ -86,6 +96,20 @@ class EventDataRpc:
         type: Literal['is_ref_valid_response']
         is_valid: bool
 
+    #
+    class GetSceneSnapshotRequest(BaseModel):
+        type: Literal['get_scene_snapshot_request']
+        radius_ingame: float
+        test_line_of_sight: bool
+        known_npc_data_versions: dict[str, str] = Field(default={})
+
+    class GetSceneSnapshotResponse(BaseModel):
+        type: Literal['get_scene_snapshot_response']
+        actors: list[ActorNearby]
+        npc_data_updates: list[NpcDataUpdate]
+        env_data: EnvData
+        player_data_fast: PlayerDataFast
+
     # NB: Do not forget to add data to the discriminated union below.
 
 
@@ -99,6 +123,9 @@ EventDataRpcUnion = Union[
     EventDataRpc.GetNpcRequest,
     EventDataRpc.GetNpcResponse,
 
+    EventDataRpc.GetNpcsRequest,
+    EventDataRpc.GetNpcsResponse,
+
     EventDataRpc.GetActorsNearbyRequest,
     EventDataRpc.GetActorsNearbyResponse,
 
@@ -113,4 +140,7 @@ EventDataRpcUnion = Union[
 
     EventDataRpc.IsRefValidRequest,
     EventDataRpc.IsRefValidResponse,
+
+    EventDataRpc.GetSceneSnapshotRequest,
+    EventDataRpc.GetSceneSnapshotResponse,
 ]
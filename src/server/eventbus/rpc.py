@@ -2,14 +2,18 @@ import asyncio
 from eventbus.data.player_data_fast import PlayerDataFast
 from util.logger import Logger
 import time
+from typing import NoReturn
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from eventbus.bus import EventBus
 from eventbus.event import Event
 from eventbus.event_data.event_data_rpc import EventDataRpc
 from eventbus.data.env_data import EnvData
 from eventbus.data.npc_data import NpcData
+from eventbus.data.npc_data_update import NpcDataUpdate
 from eventbus.data.player_data import PlayerData
+from eventbus.data.scene_snapshot import SceneSnapshot
+from util.lru_cache import LruCache
 
 logger = Logger(__name__)
 
@@ -17,24 +21,36 @@ class Rpc:
     class Config(BaseModel):
         max_wait_time_sec: float
 
+        # get_npc_data calls made within this window are sent to the game as one get_npcs_request.
+        npc_data_batch_window_sec: float = Field(default=0.01)
+
     def __init__(self, config: Config, event_bus: EventBus) -> None:
         self._config = config
         self._event_bus = event_bus
+        # Responses are matched by event id, whatever their type is.
         self._event_bus.register_handler(self._handle_event)
 
-        self._waiting_response_for_event_ids: set[int] = set()
-        self._request_event_id_to_response_event: dict[int, Event] = {}
+        self._waiting_response_for_event_ids: dict[int, asyncio.Future[Event]] = {}
+
+        self._npc_data_batch: dict[str, list[asyncio.Future[NpcData]]] = {}
+        self._npc_data_batch_task: asyncio.Task[None] | None = None
+
+        # Same bound as the NPC cache, an NPC which is not known anymore just gets full data next time.
+        self._npc_ref_id_to_versioned_npc_data: LruCache[str, tuple[str, NpcData]] = LruCache(max_entries=300)
+        self._npc_ref_ids_in_last_scene_snapshot: list[str] = []
 
     async def get_npc_data(self, npc_ref_id: str) -> NpcData:
-        request = Event(data=EventDataRpc.GetNpcRequest(
-            type='get_npc_request',
-            npc_ref_id=npc_ref_id
-        ))
+        future = asyncio.get_event_loop().create_future()
+        self._npc_data_batch.setdefault(npc_ref_id, []).append(future)
 
-        response = await self._call(request)
-        if response.data.type != 'get_npc_response':
-            self._raise_unknown_response_exception(request, response)
-        return response.data.npc_data
+        if self._npc_data_batch_task is None:
+            self._npc_data_batch_task = asyncio.get_event_loop().create_task(self._flush_npc_data_batch())
+
+        return await future
+
+    async def get_npcs_data(self, npc_ref_ids: list[str]) -> list[NpcData]:
+        updates = await self._get_npc_data_updates(npc_ref_ids, self._get_known_npc_data_versions(npc_ref_ids))
+        return await self._apply_npc_data_updates(updates)
 
     async def get_local_player(self) -> PlayerData:
         request = Event(data=EventDataRpc.GetLocalPlayerRequest(type='get_local_player_request'))
@@ -64,34 +80,135 @@ class Rpc:
             self._raise_unknown_response_exception(request, response)
         return response.data
 
+    async def get_scene_snapshot(self, data: EventDataRpc.GetSceneSnapshotRequest) -> SceneSnapshot:
+        data.known_npc_data_versions = self._get_known_npc_data_versions(self._npc_ref_ids_in_last_scene_snapshot)
+
+        request = Event(data=data)
+        response = await self._call(request)
+        if response.data.type != 'get_scene_snapshot_response':
+            self._raise_unknown_response_exception(request, response)
+
+        self._npc_ref_ids_in_last_scene_snapshot = list(map(lambda u: u.ref_id, response.data.npc_data_updates))
+
+        return SceneSnapshot(
+            actors=response.data.actors,
+            npc_data_list=await self._apply_npc_data_updates(response.data.npc_data_updates),
+            env_data=response.data.env_data,
+            player_data_fast=response.data.player_data_fast
+        )
+
+    async def _flush_npc_data_batch(self):
+        await asyncio.sleep(self._config.npc_data_batch_window_sec)
+
+        batch = self._npc_data_batch
+        self._npc_data_batch = {}
+        self._npc_data_batch_task = None
+
+        logger.debug(f"RPC batch of npc data for {len(batch)} NPCs")
+        try:
+            npc_data_list = await self.get_npcs_data(list(batch.keys()))
+        except Exception as error:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+            return
+
+        ref_id_to_npc_data = {npc_data.ref_id: npc_data for npc_data in npc_data_list}
+        for ref_id, futures in batch.items():
+            npc_data = ref_id_to_npc_data.get(ref_id, None)
+            for future in futures:
+                if future.done():
+                    continue
+
+                if npc_data is None:
+                    future.set_exception(Exception(f"NPC {ref_id} is absent in the game"))
+                else:
+                    future.set_result(npc_data)
+
+    async def _get_npc_data_updates(self, npc_ref_ids: list[str], known_npc_data_versions: dict[str, str]) -> list[NpcDataUpdate]:
+        request = Event(data=EventDataRpc.GetNpcsRequest(
+            type='get_npcs_request',
+            npc_ref_ids=npc_ref_ids,
+            known_npc_data_versions=known_npc_data_versions
+        ))
+
+        response = await self._call(request)
+        if response.data.type != 'get_npcs_response':
+            self._raise_unknown_response_exception(request, response)
+        return response.data.npc_data_updates
+
+    def _get_known_npc_data_versions(self, npc_ref_ids: list[str]) -> dict[str, str]:
+        known_versions: dict[str, str] = {}
+        for ref_id in npc_ref_ids:
+            versioned_npc_data = self._npc_ref_id_to_versioned_npc_data.peek(ref_id)
+            if versioned_npc_data:
+                known_versions[ref_id] = versioned_npc_data[0]
+        return known_versions
+
+    async def _apply_npc_data_updates(self, updates: list[NpcDataUpdate]) -> list[NpcData]:
+        npc_data_list: list[NpcData] = []
+        ref_ids_without_base: list[str] = []
+
+        for update in updates:
+            known = self._npc_ref_id_to_versioned_npc_data.get(update.ref_id)
+
+            npc_data: NpcData
+            if known is not None and known[0] == update.version:
+                # Concurrent requests sent the same known version, the same delta may be already applied.
+                npc_data = known[1]
+            elif update.base_version is None:
+                npc_data = NpcData.model_validate(update.changed_fields or {})
+            elif known is None or known[0] != update.base_version:
+                logger.warning(f"Received NPC data delta for unknown base version: {update.ref_id} {update.base_version}")
+                ref_ids_without_base.append(update.ref_id)
+                continue
+            else:
+                d = known[1].model_dump(mode='json')
+                for field in update.removed_fields:
+                    d.pop(field, None)
+                d.update(update.changed_fields or {})
+                npc_data = NpcData.model_validate(d)
+
+            self._npc_ref_id_to_versioned_npc_data.put(update.ref_id, (update.version, npc_data))
+
+            # Callers modify NpcData in place, keep the known version intact.
+            npc_data_list.append(npc_data.model_copy(deep=True))
+
+        if len(ref_ids_without_base) > 0:
+            # No known versions, so the game sends full data.
+            full_updates = await self._get_npc_data_updates(ref_ids_without_base, {})
+            npc_data_list.extend(await self._apply_npc_data_updates(full_updates))
+
+        return npc_data_list
+
     async def _call(self, request_event: Event) -> Event:
         # event_id is set only after this call.
         self._event_bus.produce_event(request_event)
+        event_id = request_event.event_id
 
-        self._waiting_response_for_event_ids.add(request_event.event_id)
-        logger.debug(f"RPC call added id={request_event.event_id} total={len(self._waiting_response_for_event_ids)}")
+        response_future = asyncio.get_event_loop().create_future()
+        self._waiting_response_for_event_ids[event_id] = response_future
+        logger.debug(f"RPC call added id={event_id} total={len(self._waiting_response_for_event_ids)}")
 
         t0 = time.time()
-        while True:
-            if (time.time() - t0) > self._config.max_wait_time_sec:
-                self._raise_timeout_exception(request_event)
-
-            if request_event.event_id not in self._request_event_id_to_response_event:
-                await asyncio.sleep(1.0 / 20.0)
-                continue
-
-            response_event = self._request_event_id_to_response_event.pop(request_event.event_id)
-            logger.debug(f"RPC call resolved id={request_event.event_id} in {time.time() - t0} sec")
+        try:
+            response_event = await asyncio.wait_for(response_future, timeout=self._config.max_wait_time_sec)
+        except asyncio.TimeoutError:
+            self._raise_timeout_exception(request_event)
+        finally:
+            self._waiting_response_for_event_ids.pop(event_id, None)
 
-            return response_event
+        logger.debug(f"RPC call resolved id={event_id} in {time.time() - t0} sec")
+        return response_event
 
     async def _handle_event(self, event: Event):
         if event.response_to_event_id is None:
             return
 
-        if event.response_to_event_id in self._waiting_response_for_event_ids:
-            self._waiting_response_for_event_ids.remove(event.response_to_event_id)
-            self._request_event_id_to_response_event[event.response_to_event_id] = event
+        response_future = self._waiting_response_for_event_ids.pop(event.response_to_event_id, None)
+        if response_future is not None and not response_future.done():
+            response_future.set_result(event)
 
             logger.debug(f"Received response event for id={event.response_to_event_id}")
         else:
@@ -101,6 +218,6 @@ class Rpc:
         logger.error(f"Received unexpected response: request={request} response={response}")
         raise Exception("Received unexpected response")
 
-    def _raise_timeout_exception(self, request: Event):
+    def _raise_timeout_exception(self, request: Event) -> NoReturn:
         logger.error(f"RPC call timeout: request={request}")
         raise Exception(f"RPC call timeout")
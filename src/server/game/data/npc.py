@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from eventbus.data.actor_ref import ActorRef
 from eventbus.data.npc_data import NpcData
@@ -12,7 +12,8 @@ class Npc(BaseModel):
     npc_data: NpcData
 
     personality: NpcPersonality
-    personal_story: Story
+    # Loaded on first use, see NpcDatabase.get_personal_story.
+    personal_story: Story | None = Field(default=None)
 
     behavior: NpcBehavior
 
@@ -86,7 +86,7 @@ class GameMaster:
         self._pause_story_loop = False
         self._listener_k.start()
 
-        event_consumer.register_handler(self._handler)
+        event_consumer.register_handler(self._handler, {'npc_death', 'ashfall_eat_stew', 'barter_offer', 'cell_changed'})
 
         asyncio.get_event_loop().create_task(self._progress_story_loop())
 
@@ -201,6 +201,7 @@ class GameMaster:
         item_data_list: list[StoryItemDataAlias]
     ):
         await self._publish_lock.acquire()
+        self._npc_service.hold_npcs()
         try:
             target = self._get_player_target()
             hearing_npcs = await self._get_npcs_who_can_hear_player(target)
@@ -214,10 +215,12 @@ class GameMaster:
                 item_data_list
             )
         finally:
+            self._npc_service.release_npcs()
             self._publish_lock.release()
 
     async def _determine_npc_to_act_and_act(self):
         try:
+            self._npc_service.hold_npcs()
             await self._publish_lock.acquire()
             scene_lock_generation_id = self._npc_speaker_service.lock_scene()
 
@@ -302,6 +305,7 @@ class GameMaster:
             if self._npc_speaker_service.is_scene_locked():
                 self._npc_speaker_service.unlock_scene()
         finally:
+            self._npc_service.release_npcs()
             self._publish_lock.release()
 
     async def _get_npcs_who_can_hear_player(self, target_ref: Optional[ActorRef]):
@@ -10,6 +10,7 @@ from game.service.player_services.player_database import PlayerDatabase
 from game.service.player_services.player_personal_story_service import PlayerPersonalStoryService
 from game.service.providers.cell_name_provider import CellNameProvider
 from game.service.providers.dropped_items_provider import DroppedItemsProvider
+from game.service.providers.scene_snapshot_provider import SceneSnapshotProvider
 from game.service.scene.scene_instructions import SceneInstructions
 from game.service.util.text_sanitizer import TextSanitizer
 from util.logger import Logger
@@ -68,7 +69,8 @@ class GameSetup:
             player_data=player_data,
             personal_story=Story()
         )
-        player_provider = PlayerProvider(rpc, player)
+        scene_snapshot_provider = SceneSnapshotProvider(rpc)
+        player_provider = PlayerProvider(rpc, scene_snapshot_provider, player)
         logger.info(f"{SUCCESS} Got player data for '{player_data.name}'")
 
         database = Database(config.database, player.actor_ref.name)
@@ -76,7 +78,7 @@ class GameSetup:
         #
         logger.info(f"{WAITING} Requesting env for the first time...")
         env_data = await rpc.get_env()
-        env_provider = EnvProvider(env_data, rpc)
+        env_provider = EnvProvider(env_data, rpc, scene_snapshot_provider)
         logger.info(f"{SUCCESS} Got env data")
 
         #
@@ -96,16 +98,18 @@ class GameSetup:
         system_instructions_builder = NpcLlmSystemInstructionsBuilder(
             player_provider, env_provider, dropped_items_provider,
             cell_name_provider, i18n, scene_instructions)
-        npc_llm_response_producer = NpcLlmResponseProducer(llm, env_provider, system_instructions_builder, i18n)
+        npc_service = NpcService(event_bus, rpc, npc_database, env_provider, scene_snapshot_provider,
+                                 llm.create_session('personality'))
+        npc_speaker_service = NpcSpeakerService(config.npc_speaker, event_bus,
+                                                event_bus, player_provider, tts, npc_service)
+        npc_llm_response_producer = NpcLlmResponseProducer(llm, env_provider, system_instructions_builder,
+                                                           npc_speaker_service, i18n)
         pick_actor_service = NpcLlmPickActorService(config.npc_director, llm, env_provider, i18n, text_sanitizer,
                                                     scene_instructions)
 
         npc_behavior_service = NpcBehaviorService(
-            config.npc_database.max_used_in_llm_story_items, env_provider, pick_actor_service, npc_llm_response_producer,
+            config.npc_database.max_used_in_llm_story_items, npc_database, env_provider, pick_actor_service, npc_llm_response_producer,
             dialog_provider)
-        npc_service = NpcService(event_bus, rpc, npc_database, env_provider, llm.create_session())
-        npc_speaker_service = NpcSpeakerService(config.npc_speaker, event_bus,
-                                                event_bus, player_provider, tts, npc_service)
         npc_personal_story_service = NpcPersonalStoryService(npc_database, env_provider, event_bus)
 
         player_intention_analyzer = PlayerIntentionAnalyzer(llm)
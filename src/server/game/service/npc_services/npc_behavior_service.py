@@ -1,6 +1,7 @@
 from eventbus.data.actor_ref import ActorRef
 from game.data.player import Player
 from game.data.player_ref_looked_at import PlayerRefLookedAt
+from game.service.npc_services.npc_database import NpcDatabase
 from game.service.npc_services.npc_llm_pick_actor_service import NpcLlmPickActorService
 from game.service.providers.dialog_provider import DialogProvider
 from util.logger import Logger
@@ -28,10 +29,11 @@ class NpcBehaviorService:
         item_data_list: list[StoryItemDataAlias]
         is_behavior_updated: bool
 
-    def __init__(self, max_used_in_llm_story_items: int, env_provider: EnvProvider,
+    def __init__(self, max_used_in_llm_story_items: int, npc_database: NpcDatabase, env_provider: EnvProvider,
                  pick_actor_service: NpcLlmPickActorService, npc_llm_response_producer: NpcLlmResponseProducer,
                  dialog_provider: DialogProvider) -> None:
         self._max_used_in_llm_story_items = max_used_in_llm_story_items
+        self._npc_database = npc_database
         self._env_provider = env_provider
         self._pick_actor_service = pick_actor_service
         self._npc_llm_response_producer = npc_llm_response_producer
@@ -48,7 +50,8 @@ class NpcBehaviorService:
             logger.debug("No NPCs are passed, picking player to act")
             return NpcLlmPickActorService.Response(player.actor_ref, "(no npcs are passed)", pass_reason_to_npc=False)
 
-        story_items_from_npc = npcs[0].personal_story.items[-self._max_used_in_llm_story_items:]
+        npc_story = self._npc_database.get_personal_story(npcs[0], self._env_provider.now())
+        story_items_from_npc = npc_story.items[-self._max_used_in_llm_story_items:]
 
         npc_actors = list(map(lambda n: n.actor_ref, npcs))
         story_items_from_director = list(
@@ -177,7 +180,8 @@ class NpcBehaviorService:
         )
 
     def _split_items_by_being_processed_status(self, npc: Npc) -> tuple[list[StoryItem], list[StoryItem]]:
-        items_to_use_in_llm = npc.personal_story.items[-self._max_used_in_llm_story_items:]
+        npc_story = self._npc_database.get_personal_story(npc, self._env_provider.now())
+        items_to_use_in_llm = npc_story.items[-self._max_used_in_llm_story_items:]
 
         if npc.behavior.last_processed_story_item_id is None:
             return ([], items_to_use_in_llm)
@@ -1,5 +1,4 @@
-import datetime
-from pathvalidate import sanitize_filename
+import hashlib
 from pydantic import BaseModel
 from database.database import Database
 from eventbus.data.npc_data import NpcData
@@ -9,6 +8,7 @@ from game.data.npc_personality import NpcPersonality
 from game.data.story import Story
 from game.data.story_item import StoryItem
 from game.data.time import Time
+from game.service.story_item.story_database import StoryDatabase
 from util.logger import Logger
 
 logger = Logger(__name__)
@@ -22,54 +22,39 @@ class NpcDatabase:
     def __init__(self, config: Config, db: Database):
         self._config = config
         self._db = db
+        # Only the part of the story which can be used in LLM requests is kept in memory.
+        self._story_db = StoryDatabase(db, config.max_stored_story_items, config.max_used_in_llm_story_items)
+
+        self._npc_ref_id_to_saved_npc_data_hash: dict[str, str] = {}
 
     #
-    def save_personal_story(self, npc: Npc):
-        self._save_personal_story(npc.actor_ref.ref_id, npc.personal_story, "personal_story")
+    def get_personal_story(self, npc: Npc, time: Time) -> Story:
+        if npc.personal_story is None:
+            npc.personal_story = self.load_personal_story(npc.actor_ref.ref_id, time) or Story()
+        return npc.personal_story
 
-    def _save_personal_story(self, npc_ref_id: str, story: Story, file_name: str):
-        if len(story.items) > self._config.max_stored_story_items:
-            story.items = story.items[-self._config.max_stored_story_items:]
+    def save_personal_story(self, npc: Npc, story: Story):
+        self._story_db.save(['npc', npc.actor_ref.ref_id, 'personal_story'], story)
 
-        self._db.save_model(
-            path=['npc', npc_ref_id, file_name],
-            value=story
-        )
+    def append_to_personal_story(self, npc: Npc, story: Story, items: list[StoryItem]):
+        self._story_db.append(['npc', npc.actor_ref.ref_id, 'personal_story'], story, items)
 
     def load_personal_story(self, npc_ref_id: str, time: Time) -> Story | None:
-        story = self._db.load_model(
-            type=Story,
-            path=['npc', npc_ref_id, 'personal_story']
-        )
-
         should_rewind_story = True  # TODO: add toggle
-        if story and should_rewind_story:
-            items_happened_before: list[StoryItem] = []
-            items_happened_later: list[StoryItem] = []
-            for item in story.items:
-                if item.time.game_time <= time.game_time:
-                    items_happened_before.append(item)
-                else:
-                    items_happened_later.append(item)
-
-            if len(items_happened_later) > 0:
-                backup_filename = sanitize_filename(f"personal_story_backup_{datetime.datetime.now().isoformat()}")
-                logger.warning(
-                    f"Personal story of {npc_ref_id} has {len(items_happened_later)} items happened after {time.game_time}, going to back it up to {backup_filename} and remove from the original story")
-
-                self._save_personal_story(npc_ref_id, story, backup_filename)
-                story.items = items_happened_before
-
-                self._save_personal_story(npc_ref_id, story, "personal_story")
-
-        return story
+        return self._story_db.load(['npc', npc_ref_id, 'personal_story'], time, should_rewind_story)
 
     #
     def save_npc_data(self, npc: Npc):
+        # NPC data is refreshed from the game often but rarely changes.
+        npc_data_hash = hashlib.sha1(npc.npc_data.model_dump_json().encode()).hexdigest()
+        if self._npc_ref_id_to_saved_npc_data_hash.get(npc.actor_ref.ref_id, None) == npc_data_hash:
+            return
+
         self._db.save_model(
             path=['npc', npc.actor_ref.ref_id, 'last_npc_data'],
             value=npc.npc_data
         )
+        self._npc_ref_id_to_saved_npc_data_hash[npc.actor_ref.ref_id] = npc_data_hash
 
     def load_npc_data(self, npc_ref_id: str, time: Time) -> NpcData | None:
         return self._db.load_model(
@@ -58,7 +58,7 @@ class NpcLlmPickActorService:
         self._i18n = i18n
         self._sanitizer = sanitizer
 
-        self._main_session = llm_system.create_session()
+        self._main_session = llm_system.create_session('pick_actor')
         self._main_session_lock = asyncio.Lock()
 
         self._prev_reason: str = ''
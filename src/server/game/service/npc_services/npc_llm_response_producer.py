@@ -1,6 +1,7 @@
 import asyncio
 import json
 import time
+from contextlib import aclosing
 from typing import NamedTuple, Optional
 
 from pydantic import BaseModel
@@ -10,7 +11,9 @@ from game.data.story_item import StoryItem, StoryItemDataAlias, StoryItemData
 from game.i18n.i18n import I18n
 from game.service.npc_services.npc_llm_message_history_builder import NpcLlmMessageHistoryBuilder
 from game.service.npc_services.npc_llm_system_instructions_builder import NpcLlmSystemInstructionsBuilder
+from game.service.npc_services.npc_speaker_service import NpcSpeakerService
 from game.service.providers.env_provider import EnvProvider
+from game.service.util.sentence_splitter import SentenceSplitter
 from llm.message import LlmMessage
 from llm.system import LlmSystem
 from util.logger import Logger
@@ -32,7 +35,7 @@ class NpcLlmResponseProducer:
         raw_text: str
 
     class _RequestPreparedForReset(NamedTuple):
-        llm_system_instructions: str
+        llm_system_instructions: NpcLlmSystemInstructionsBuilder.Result
         llm_history_messages: list[LlmMessage]
         llm_message_to_send: str
 
@@ -42,22 +45,28 @@ class NpcLlmResponseProducer:
         unprocessed_items: list[StoryItem]
 
     def __init__(self, llm_system: LlmSystem, env_provider: EnvProvider,
-                 system_instructions_builder: NpcLlmSystemInstructionsBuilder, i18n: I18n) -> None:
+                 system_instructions_builder: NpcLlmSystemInstructionsBuilder, npc_speaker_service: NpcSpeakerService,
+                 i18n: I18n) -> None:
         self._llm_system = llm_system
+        self._npc_speaker_service = npc_speaker_service
         self._env_provider = env_provider
         self._system_instructions_builder = system_instructions_builder
         self._i18n = i18n
 
-        self._main_session = llm_system.create_session()
+        self._main_session = llm_system.create_session('npc_response')
         self._main_session_lock = asyncio.Lock()
 
     async def produce_npc_response(self, request: Request) -> Response:
         await self._main_session_lock.acquire()
         try:
+            # Leftovers of a response which was never said would take the prefetch budget and could be stale.
+            self._npc_speaker_service.discard_prefetched_voiceover(request.npc)
+
             preprocessed_request = self._prepare_data_for_llm_reset(request)
             self._main_session.reset(
-                system_instructions=preprocessed_request.llm_system_instructions,
-                messages=preprocessed_request.llm_history_messages
+                system_instructions=preprocessed_request.llm_system_instructions.text,
+                messages=preprocessed_request.llm_history_messages,
+                stable_system_instructions_length=preprocessed_request.llm_system_instructions.stable_length
             )
 
             log_context_model = NpcLlmResponseProducer._LogContext(
@@ -69,11 +78,22 @@ class NpcLlmResponseProducer:
 
             logger.info("Sent request to LLM, waiting...")
             t0 = time.time()
-            raw_text = await self._main_session.send_message(
+            # Voiceover of every complete sentence starts while the model is still generating the rest.
+            sentence_splitter = SentenceSplitter()
+            raw_text = ''
+            async with aclosing(self._main_session.stream_message(
                 user_text=preprocessed_request.llm_message_to_send,
                 log_name=request.npc.actor_ref.ref_id,
                 log_context=log_context
-            )
+            )) as stream:
+                async for chunk in stream:
+                    raw_text += chunk
+                    for sentence in sentence_splitter.feed(chunk):
+                        self._npc_speaker_service.prefetch_voiceover(
+                            request.npc, self._post_process_response_text(sentence))
+            for sentence in sentence_splitter.flush():
+                self._npc_speaker_service.prefetch_voiceover(
+                    request.npc, self._post_process_response_text(sentence))
 
             if self._llm_system.is_dummy():
                 saying_text = ""
@@ -1,4 +1,5 @@
 import math
+from typing import Any, Callable, NamedTuple
 from eventbus.data.actor_stats import ActorStats
 from eventbus.data.npc_data import NpcData
 from game.data.npc import Npc
@@ -15,11 +16,23 @@ from game.service.util.prompt_builder import PromptBuilder
 from llm.message import LlmMessage
 from util.distance import Distance
 from util.logger import Logger
+from util.lru_cache import LruCache
 
 logger = Logger(__name__)
 
 
+class _CachedSection(NamedTuple):
+    # Everything the section text depends on besides the NPC ref id, compared by value.
+    inputs: tuple[Any, ...]
+    text: str
+
+
 class NpcLlmSystemInstructionsBuilder():
+    class Result(NamedTuple):
+        text: str
+        # Leading part of the text which rarely changes between turns, LLM providers can cache it.
+        stable_length: int
+
     def __init__(self, player_provider: PlayerProvider, env_provider: EnvProvider,
                  dropped_items_provider: DroppedItemsProvider,
                  cell_name_provider: CellNameProvider, i18n: I18n,
@@ -31,20 +44,56 @@ class NpcLlmSystemInstructionsBuilder():
         self._i18n = i18n
         self._scene_instructions = scene_instructions
 
-    def build(self, npc: Npc, other_npcs: list[Npc], messages: list[LlmMessage]) -> str:
-        b = PromptBuilder()
+        self._ref_id_to_sections: LruCache[str, dict[str, _CachedSection]] = LruCache(max_entries=300)
+
+    def build(self, npc: Npc, other_npcs: list[Npc], messages: list[LlmMessage]) -> Result:
         d = npc.npc_data
 
-        self._initial(npc, b, d)
-        self._what_npc_does(b, d)
-        self._current_env(b, d)
-        self._health(b, d)
-        self._npcs_nearby(npc, b, d, other_npcs)
-        self._player_info(npc, b, d)
-        self._info_from_wiki(npc, b, d)
-        self._final(npc, b, d, other_npcs, messages)
+        p = self._player_provider.local_player.player_data
 
-        return b.__str__()
+        stable = PromptBuilder()
+        self._cached_section(npc, stable, 'initial', (
+            d.name, d.female, d.race, npc.personality.background, d.class_name, d.stats, d.faction, d.equipped, d.nakedness
+        ), lambda b: self._initial(npc, b, d))
+        self._cached_section(npc, stable, 'what_npc_does', (
+            d.name, d.class_name, d.is_ashfall_innkeeper, d.ashfall_stew_cost, d.ai_config
+        ), lambda b: self._what_npc_does(b, d))
+        self._cached_section(npc, stable, 'info_from_wiki', (
+            d.cell.id, d.faction.faction_id if d.faction else None, p.name
+        ), lambda b: self._info_from_wiki(npc, b, d))
+        self._rules(stable)
+
+        volatile = PromptBuilder()
+        self._current_env(volatile, d)
+        self._cached_section(npc, volatile, 'health', (
+            d.name, d.in_combat, d.hostiles, d.health_normalized, d.is_diseased
+        ), lambda b: self._health(b, d))
+        self._npcs_nearby(npc, volatile, d, other_npcs)
+        self._player_info(npc, volatile, d)
+        self._final(npc, volatile, d, other_npcs, messages)
+
+        stable_text = f"{stable}\n\n"
+        return NpcLlmSystemInstructionsBuilder.Result(f"{stable_text}{volatile}", len(stable_text))
+
+    def _cached_section(self, npc: Npc, b: PromptBuilder, name: str, inputs: tuple[Any, ...],
+                        build_section: Callable[[PromptBuilder], None]):
+        sections = self._ref_id_to_sections.get(npc.actor_ref.ref_id)
+        if sections is None:
+            sections = {}
+            self._ref_id_to_sections.put(npc.actor_ref.ref_id, sections)
+
+        # Refreshed NpcData is a new object, the section is rebuilt only if its inputs actually changed.
+        section = sections.get(name, None)
+        if section is None or section.inputs != inputs:
+            section_builder = PromptBuilder()
+            build_section(section_builder)
+            section = _CachedSection(inputs, section_builder.__str__())
+            sections[name] = section
+
+        # Sections start with their own paragraph, so the text is the same as if it was built in place.
+        if len(section.text) > 0:
+            b.paragraph()
+            b.line(section.text)
 
     def _initial(self, npc: Npc, b: PromptBuilder, d: NpcData) -> None:
         b.paragraph()
@@ -588,12 +637,8 @@ class NpcLlmSystemInstructionsBuilder():
 Ты не хочешь, чтобы кто попало вступал в гильдию - ты хочешь, чтобы члены гильдии были честными и сильными.
 """)
 
-    def _final(self, npc: Npc, b: PromptBuilder, d: NpcData, other_npcs: list[Npc], messages: list[LlmMessage]) -> None:
-        p = self._player_provider.local_player.player_data
-
+    def _rules(self, b: PromptBuilder) -> None:
         b.paragraph()
-        b.reset_option_index()
-
         b.line(f"""
 
 # ПРАВИЛА
@@ -636,6 +681,15 @@ class NpcLlmSystemInstructionsBuilder():
 Например, чтобы дать 36 монет напиши "trigger_drop_gold[36]".
 
 """)
+
+    def _final(self, npc: Npc, b: PromptBuilder, d: NpcData, other_npcs: list[Npc], messages: list[LlmMessage]) -> None:
+        p = self._player_provider.local_player.player_data
+
+        b.paragraph()
+        # Rules are in the cached prefix, far above, so the options point back to them.
+        b.line("# ТРИГГЕРЫ ДЛЯ ТЕКУЩЕЙ СЦЕНЫ")
+        b.line("Дополняют разделы ТРИГГЕРЫ и ПЕРЕДАЧА ВЕЩЕЙ из ПРАВИЛ выше и добавляются к ответу так же:")
+        b.reset_option_index()
         if len(self._dropped_items_provider.dropped_items) > 0:
             item_index = 0
             for item in self._dropped_items_provider.dropped_items:
@@ -26,11 +26,12 @@ class NpcPersonalStoryService:
 
         for npc in npcs:
             should_save_behavior = False
+            story = self._db.get_personal_story(npc, self._env_provider.now())
 
             items: list[StoryItem] = []
             for item_data in item_data_list:
                 items.append(StoryItem(
-                    item_id=npc.personal_story.return_next_item_id_and_inc(),
+                    item_id=story.return_next_item_id_and_inc(),
                     time=self._env_provider.now(),
                     data=item_data
                 ))
@@ -44,13 +45,13 @@ class NpcPersonalStoryService:
                     npc.behavior.relation_to_other_npc[item_data.target.ref_id] = new_relation
                     should_save_behavior = True
 
-            npc.personal_story.items.extend(items)
-            self._db.save_personal_story(npc)
+            story.items.extend(items)
+            self._db.append_to_personal_story(npc, story, items)
 
             is_last_item_initiated_by_npc = NpcStoryItemHelper.is_actor_is_initiator(npc.actor_ref, item_data_list[-1])
             if is_last_item_initiated_by_npc:
                 should_save_behavior = True
 
             if should_save_behavior:
-                npc.behavior.last_processed_story_item_id = npc.personal_story.items[-1].item_id
+                npc.behavior.last_processed_story_item_id = story.items[-1].item_id
                 self._db.save_npc_behavior(npc)
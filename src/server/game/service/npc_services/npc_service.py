@@ -4,6 +4,7 @@ from llm.session import LlmSession
 from util.logger import Logger
 
 from game.service.npc_services.npc_database import NpcDatabase
+from eventbus.data.actor_nearby import ActorNearby
 from eventbus.data.actor_ref import ActorRef
 from eventbus.data.npc_data import NpcData
 from eventbus.rpc import Rpc
@@ -14,8 +15,10 @@ from game.data.npc import Npc
 from game.data.npc_behavior import NpcBehavior
 from game.data.story import Story
 from game.service.providers.env_provider import EnvProvider
+from game.service.providers.scene_snapshot_provider import SceneSnapshotProvider
 from game.service.npc_services.npc_personality_generator import NpcPersonalityGenerator
 from util.distance import Distance
+from util.lru_cache import LruCache
 from util.now_ms import now_ms
 
 logger = Logger(__name__)
@@ -24,102 +27,245 @@ logger = Logger(__name__)
 @dataclass
 class _NpcInMemory:
     npc: Npc
-    npc_data_expire_at_ms: int
+    npc_data_updated_at_ms: int
+    npc_data_saved_at_ms: int
+    npc_data_refresh_task: asyncio.Task[None] | None = None
 
 
 class NpcService:
     def __init__(self, consumer: EventConsumer, rpc: Rpc, db: NpcDatabase, env_provider: EnvProvider,
-                 llm_session: LlmSession) -> None:
+                 scene_snapshot_provider: SceneSnapshotProvider, llm_session: LlmSession) -> None:
         self._rpc = rpc
         self._db = db
         self._npc_personality_generator = NpcPersonalityGenerator(llm_session)
 
         self._env_provider = env_provider
+        self._scene_snapshot_provider = scene_snapshot_provider
+        self._scene_snapshot_max_age_ms = 500
 
-        self._ref_id_to_npc: dict[str, _NpcInMemory] = {}
-        self._npc_data_expiration_ms = 30_000
-        self._npc_ref_id_being_queried: set[str] = set()
+        # Stories in memory are trimmed to what is used in LLM requests, so the number of NPCs bounds the memory.
+        self._ref_id_to_npc: LruCache[str, _NpcInMemory] = LruCache(
+            max_entries=300,
+            on_evict=self._on_npc_evicted,
+            can_evict=self._can_evict_npc
+        )
+        # NPCs got while held are referenced by an ongoing dialog, evicting them would make a second copy of them.
+        self._npc_holds_count = 0
+        self._held_npc_ref_ids: set[str] = set()
+        # Cached npc data is returned right away and refreshed in background once it is older than this.
+        # NPCs around the player are kept fresh by scene snapshot deltas, so this only catches the rest,
+        # every refresh makes the game rebuild the whole npc data.
+        self._npc_data_stale_after_ms = 30_000
+        # Npc data is refreshed often, but saved to the database not more often than this.
+        self._npc_data_save_interval_ms = 30_000
+        self._npc_ref_id_to_query_task: dict[str, asyncio.Task[Npc]] = {}
+
+        # NPCs around the player are created ahead of time, closest first, so the first dialog with them doesn't wait for it.
+        self._prewarm_queue: asyncio.PriorityQueue[tuple[float, str, NpcData | None]] = asyncio.PriorityQueue()
+        self._npc_ref_ids_in_prewarm_queue: set[str] = set()
+        self._max_prewarm_queue_size = 100
+        self._prewarm_concurrency = 2
+        for _ in range(self._prewarm_concurrency):
+            asyncio.get_event_loop().create_task(self._prewarm_worker())
+
+        consumer.register_handler(self._handle_event, {'npc_death', 'cell_changed'})
+
+    def hold_npcs(self):
+        self._npc_holds_count += 1
 
-        consumer.register_handler(self._handle_event)
+    def release_npcs(self):
+        self._npc_holds_count -= 1
+        if self._npc_holds_count == 0:
+            self._held_npc_ref_ids.clear()
 
     def clear_cache(self):
         self._ref_id_to_npc.clear()
+        self._log_cache_stats()
+
+    async def get_npc(self, npc_ref_id: str, npc_data_from_game: NpcData | None = None) -> Npc:
+        if self._npc_holds_count > 0:
+            self._held_npc_ref_ids.add(npc_ref_id)
+
+        # Everyone who asks for the same NPC at the same time shares one query.
+        query_task = self._npc_ref_id_to_query_task.get(npc_ref_id, None)
+        if query_task is None:
+            query_task = asyncio.get_event_loop().create_task(self._query_npc(npc_ref_id, npc_data_from_game))
+            self._npc_ref_id_to_query_task[npc_ref_id] = query_task
+            return await asyncio.shield(query_task)
+
+        joined_at_ms = now_ms()
+        npc = await asyncio.shield(query_task)
+
+        # Shared query may have put npc data fetched after this caller got its own, that one is fresher.
+        npc_in_memory = self._ref_id_to_npc.peek(npc_ref_id)
+        if npc_data_from_game and npc_in_memory and npc_in_memory.npc_data_updated_at_ms < joined_at_ms:
+            self._update_npc_data(npc_in_memory, npc_data_from_game)
+        return npc
+
+    async def get_npcs(self, npc_ref_ids: list[str], ref_id_to_npc_data: dict[str, NpcData] = {}) -> list[Npc]:
+        # Queried concurrently so RPC batches npc data of the whole crowd into one round trip.
+        return await asyncio.gather(*map(
+            lambda ref_id: self.get_npc(ref_id, ref_id_to_npc_data.get(ref_id, None)),
+            npc_ref_ids
+        ))
+
+    async def get_npcs_who_can_hear_another_actor(self, another_actor: ActorRef) -> list[Npc]:
+        actors_nearby: list[ActorNearby]
+        ref_id_to_npc_data: dict[str, NpcData] = {}
+
+        if another_actor.type == 'player':
+            snapshot = await self._scene_snapshot_provider.get_snapshot(max_age_ms=self._scene_snapshot_max_age_ms)
+            actors_nearby = snapshot.actors
+            ref_id_to_npc_data = {npc_data.ref_id: npc_data for npc_data in snapshot.npc_data_list}
+            self._prewarm_npcs(actors_nearby, ref_id_to_npc_data)
+        else:
+            data = EventDataRpc.GetActorsNearbyRequest(
+                type='get_actors_nearby_request',
+                actor_ref_id=another_actor.ref_id,
+                radius_ingame=Distance.from_meters_to_ingame(50),
+                test_line_of_sight=True
+            )
+            response = await self._rpc.get_actors_nearby(data)
+            actors_nearby = response.actors
+
+        actors_hearing: list[ActorNearby] = []
+        for actor in actors_nearby:
+            if actor.actor_ref.type == 'creature':
+                if actor.actor_ref.ref_id not in ['vivec_god00000000']:
+                    continue
+
+            if not actor.can_see and Distance.from_ingame_to_meters(actor.distance_ingame) > 3:
+                continue
+
+            actors_hearing.append(actor)
+
+        npcs_hearing = await self.get_npcs(list(map(lambda a: a.actor_ref.ref_id, actors_hearing)), ref_id_to_npc_data)
 
-    async def get_npc(self, npc_ref_id: str) -> Npc:
-        while npc_ref_id in self._npc_ref_id_being_queried:
-            await asyncio.sleep(1.0 / 30.0)
+        npcs: list[Npc] = []
+        for actor, npc in zip(actors_hearing, npcs_hearing):
+            if npc.npc_data.is_dead:
+                continue
+
+            npc.npc_data.player_distance = actor.distance_ingame
+
+            npcs.append(npc)
 
-        self._npc_ref_id_being_queried.add(npc_ref_id)
+        return npcs
+
+    async def _query_npc(self, npc_ref_id: str, npc_data_from_game: NpcData | None) -> Npc:
         try:
             # memory
-            npc_in_memory = self._ref_id_to_npc.get(npc_ref_id, None)
+            npc_in_memory = self._ref_id_to_npc.get(npc_ref_id)
             if npc_in_memory:
-                if now_ms() > npc_in_memory.npc_data_expire_at_ms:
-                    npc_in_memory.npc.npc_data = await self._rpc.get_npc_data(npc_ref_id)
-                    self._db.save_npc_data(npc_in_memory.npc)
+                if npc_data_from_game:
+                    self._update_npc_data(npc_in_memory, npc_data_from_game)
+                elif self._is_npc_data_stale(npc_in_memory) and npc_in_memory.npc_data_refresh_task is None:
+                    npc_in_memory.npc_data_refresh_task = asyncio.get_event_loop().create_task(
+                        self._refresh_npc_data(npc_in_memory))
 
                 return npc_in_memory.npc
 
+            if self._ref_id_to_npc.misses % 100 == 0:
+                self._log_cache_stats()
+
             # db
             npc_from_db = self._get_from_database(npc_ref_id)
             if npc_from_db:
-                self._ref_id_to_npc[npc_ref_id] = _NpcInMemory(
-                    npc_from_db,
-                    now_ms() + self._npc_data_expiration_ms
-                )
-
-                npc_from_db.npc_data = await self._rpc.get_npc_data(npc_ref_id)
+                # Npc data in the database can be days old in game, so it is not served stale.
+                npc_from_db.npc_data = npc_data_from_game or await self._rpc.get_npc_data(npc_ref_id)
                 self._db.save_npc_data(npc_from_db)
+
+                self._ref_id_to_npc.put(npc_ref_id, _NpcInMemory(npc_from_db, now_ms(), now_ms()))
                 return npc_from_db
 
             # game
-            npc_data_from_game = await self._rpc.get_npc_data(npc_ref_id)
+            if npc_data_from_game is None:
+                npc_data_from_game = await self._rpc.get_npc_data(npc_ref_id)
             new_npc = await self._create_new_npc(npc_data_from_game)
-            self._ref_id_to_npc[npc_ref_id] = _NpcInMemory(
-                new_npc,
-                now_ms() + self._npc_data_expiration_ms
-            )
+            self._ref_id_to_npc.put(npc_ref_id, _NpcInMemory(new_npc, now_ms(), now_ms()))
             return new_npc
         finally:
-            self._npc_ref_id_being_queried.remove(npc_ref_id)
+            del self._npc_ref_id_to_query_task[npc_ref_id]
 
-    async def get_npcs_who_can_hear_another_actor(self, another_actor: ActorRef) -> list[Npc]:
-        data = EventDataRpc.GetActorsNearbyRequest(
-            type='get_actors_nearby_request',
-            actor_ref_id=another_actor.ref_id,
-            radius_ingame=Distance.from_meters_to_ingame(50),
-            test_line_of_sight=True
-        )
-        response = await self._rpc.get_actors_nearby(data)
+    def _is_npc_data_stale(self, npc_in_memory: _NpcInMemory) -> bool:
+        return now_ms() > npc_in_memory.npc_data_updated_at_ms + self._npc_data_stale_after_ms
 
-        npcs: list[Npc] = []
-        for actor in response.actors:
-            if actor.actor_ref.type == 'creature':
-                if actor.actor_ref.ref_id not in ['vivec_god00000000']:
-                    continue
+    def _update_npc_data(self, npc_in_memory: _NpcInMemory, npc_data: NpcData):
+        npc_in_memory.npc.npc_data = npc_data
+        npc_in_memory.npc_data_updated_at_ms = now_ms()
 
-            if not actor.can_see and Distance.from_ingame_to_meters(actor.distance_ingame) > 3:
-                continue
+        if now_ms() > npc_in_memory.npc_data_saved_at_ms + self._npc_data_save_interval_ms:
+            npc_in_memory.npc_data_saved_at_ms = now_ms()
+            self._db.save_npc_data(npc_in_memory.npc)
 
-            npc = await self.get_npc(actor.actor_ref.ref_id)
-            if npc.npc_data.is_dead:
+    async def _refresh_npc_data(self, npc_in_memory: _NpcInMemory):
+        try:
+            requested_at_ms = now_ms()
+            npc_data = await self._rpc.get_npc_data(npc_in_memory.npc.actor_ref.ref_id)
+
+            # Fresher data could come from the game while the refresh was in flight.
+            if npc_in_memory.npc_data_updated_at_ms <= requested_at_ms:
+                self._update_npc_data(npc_in_memory, npc_data)
+        except Exception as error:
+            logger.warning(f"Failed to refresh npc data of {npc_in_memory.npc}: {error}")
+        finally:
+            npc_in_memory.npc_data_refresh_task = None
+
+    def _prewarm_npcs(self, actors: list[ActorNearby], ref_id_to_npc_data: dict[str, NpcData]):
+        for actor in actors:
+            ref_id = actor.actor_ref.ref_id
+            if actor.actor_ref.type != 'npc' or ref_id in self._ref_id_to_npc or ref_id in self._npc_ref_id_to_query_task:
+                continue
+            if ref_id in self._npc_ref_ids_in_prewarm_queue or self._prewarm_queue.qsize() >= self._max_prewarm_queue_size:
                 continue
 
-            npc.npc_data.player_distance = actor.distance_ingame
+            self._npc_ref_ids_in_prewarm_queue.add(ref_id)
+            self._prewarm_queue.put_nowait((actor.distance_ingame, ref_id, ref_id_to_npc_data.get(ref_id, None)))
 
-            npcs.append(npc)
+    async def _prewarm_scene(self):
+        try:
+            snapshot = await self._scene_snapshot_provider.get_snapshot(max_age_ms=self._scene_snapshot_max_age_ms)
+            self._prewarm_npcs(snapshot.actors, {npc_data.ref_id: npc_data for npc_data in snapshot.npc_data_list})
+        except Exception as error:
+            logger.warning(f"Failed to get scene snapshot to prewarm NPCs: {error}")
 
-        return npcs
+    async def _prewarm_worker(self):
+        while True:
+            _, ref_id, npc_data = await self._prewarm_queue.get()
+            self._npc_ref_ids_in_prewarm_queue.discard(ref_id)
+
+            if ref_id in self._ref_id_to_npc:
+                continue
+
+            try:
+                await self.get_npc(ref_id, npc_data)
+                logger.debug(f"NPC {ref_id} is prewarmed")
+            except Exception as error:
+                logger.warning(f"Failed to prewarm NPC {ref_id}: {error}")
 
     async def _handle_event(self, event: Event):
         if event.data.type == 'npc_death':
-            if event.data.actor.ref_id in self._ref_id_to_npc:
-                npc = self._ref_id_to_npc[event.data.actor.ref_id]
+            npc = self._ref_id_to_npc.peek(event.data.actor.ref_id)
+            if npc:
                 npc.npc.npc_data.is_dead = True
+        elif event.data.type == 'cell_changed':
+            # Scene snapshot takes a round trip to the game, handler doesn't wait for it.
+            asyncio.get_event_loop().create_task(self._prewarm_scene())
+
+    def _can_evict_npc(self, npc_ref_id: str, npc_in_memory: _NpcInMemory) -> bool:
+        return npc_ref_id not in self._npc_ref_id_to_query_task and npc_ref_id not in self._held_npc_ref_ids
+
+    def _on_npc_evicted(self, npc_ref_id: str, npc_in_memory: _NpcInMemory):
+        # NPC data is refreshed from the game more often than it is saved.
+        self._db.save_npc_data(npc_in_memory.npc)
+
+    def _log_cache_stats(self):
+        logger.debug(f"""NPC cache: size={len(self._ref_id_to_npc)} hits={
+            self._ref_id_to_npc.hits} misses={self._ref_id_to_npc.misses} evictions={self._ref_id_to_npc.evictions}""")
 
     def _get_from_database(self, npc_ref_id: str) -> Npc | None:
+        # Personal story is loaded later, only for NPCs which take part in a dialog.
         now = self._env_provider.now()
-        story = self._db.load_personal_story(npc_ref_id, now)
         behavior = self._db.load_npc_behavior(npc_ref_id, now)
         personality = self._db.load_npc_personality(npc_ref_id, now)
 
@@ -130,18 +276,17 @@ class NpcService:
             logger.warning(f"Npc data failed to load from DB: {error}")
             return None
 
-        if npc_data and story and behavior and personality:
+        if npc_data and behavior and personality:
             npc = Npc(
                 actor_ref=ActorRef(ref_id=npc_ref_id, type='npc', name=npc_data.name, female=npc_data.female),
                 npc_data=npc_data,
                 personality=personality,
-                personal_story=story,
                 behavior=behavior
             )
             return npc
-        elif npc_data or story or behavior or personality:
+        elif npc_data or behavior or personality:
             logger.error(f"NPC {npc_ref_id} has partial data locally")
-            logger.debug(f"""npc_data={npc_data is not None} story={story is not None} behavior={
+            logger.debug(f"""npc_data={npc_data is not None} behavior={
                 behavior is not None} personality={personality is not None}""")
             return None
         else:
@@ -150,11 +295,12 @@ class NpcService:
     async def _create_new_npc(self, npc_data: NpcData) -> Npc:
         logger.info(f"Generating new NPC context for {npc_data.ref_id}")
 
+        story = Story(items=[])
         npc = Npc(
             actor_ref=ActorRef(ref_id=npc_data.ref_id, type='npc', name=npc_data.name, female=npc_data.female),
             npc_data=npc_data,
             personality=await self._npc_personality_generator.generate(npc_data, self._env_provider.now().game_time),
-            personal_story=Story(items=[]),
+            personal_story=story,
             behavior=NpcBehavior(
                 last_processed_story_item_id=None,
                 relation_to_other_npc={}
@@ -163,7 +309,7 @@ class NpcService:
 
         self._db.save_npc_data(npc)
         self._db.save_npc_personality(npc)
-        self._db.save_personal_story(npc)
+        self._db.save_personal_story(npc, story)
         self._db.save_npc_behavior(npc)
 
         return npc
@@ -11,6 +11,7 @@ from eventbus.event_producer import EventProducer
 from game.data.npc import Npc
 from game.service.npc_services.npc_service import NpcService
 from game.service.player_services.player_provider import PlayerProvider
+from game.service.util.sentence_splitter import SentenceSplitter
 from tts.request import TtsRequest
 from tts.response import TtsResponse
 from tts.system import TtsSystem
@@ -104,6 +105,10 @@ class _ActorLock:
     def locked(self):
         return self._lock.locked()
 
+    @property
+    def generation(self):
+        return self._generation
+
     def _release_later_if_same_generation(self, delay_s: float):
         current_generation = self._generation
         asyncio.get_event_loop().call_later(
@@ -121,6 +126,11 @@ class NpcSpeakerService:
     class Config(BaseModel):
         release_before_end_sec: float = Field(default=4)
 
+        # Sentences of NPC response are voiced while the rest of it is being generated.
+        # Sentences changed by the response processing (triggers, target, sanitizing) are voiced again,
+        # which costs extra TTS characters.
+        prefetch_voiceover: bool = Field(default=False)
+
     def __init__(self, config: Config, consumer: EventConsumer, producer: EventProducer, player_provider: PlayerProvider, tts: TtsSystem,
                  npc_service: NpcService) -> None:
         self._config = config
@@ -135,7 +145,14 @@ class NpcSpeakerService:
         self._scene_lock = _SceneLock()
         self._actor_lock: dict[ActorRef, _ActorLock] = {}
 
-        consumer.register_handler(self._handle_event)
+        # Response is voiced and played sentence by sentence, the tail is voiced as one piece.
+        # Kept well below the number of rotated TTS files, so none is overwritten before it is played.
+        self._max_voiceover_segments = 5
+        # Unused prefetched voiceovers take rotated files too, two responses must still fit.
+        self._max_prefetched_voiceovers = 2
+        self._npc_ref_id_to_prefetched_voiceovers: dict[str, dict[str, asyncio.Task[TtsResponse | None]]] = {}
+
+        consumer.register_handler(self._handle_event, {'npc_death', 'stt_recognition_update', 'stt_recognition_complete'})
 
     async def _handle_event(self, event: Event):
         if event.data.type == 'npc_death':
@@ -202,16 +219,18 @@ class NpcSpeakerService:
     async def say(self, npc: Npc, text: str, target: ActorRef | None):
         if not self._scene_lock.locked():
             logger.debug(f"Say is called for {npc.actor_ref} but scene is not locked, skipping say")
+            self.discard_prefetched_voiceover(npc)
             return
 
         if self._scene_lock.holder != npc.actor_ref:
             logger.debug(
                 f"Say is called for NPC who does not hold the lock: npc={npc.actor_ref} holder={self._scene_lock.holder}")
+            self.discard_prefetched_voiceover(npc)
             return
 
-        tts_response = await self._produce_voiceover(npc, text)
+        voiceover_segments = await self._produce_voiceover(npc, text)
 
-        if tts_response is None:
+        if len(voiceover_segments) == 0:
             logger.debug(f"Empty TTS response, skip: npc={npc.actor_ref}")
             self.unlock_scene()
             return
@@ -226,7 +245,8 @@ class NpcSpeakerService:
             self.unlock_scene()
             return
 
-        audio_duration_sec = mutagen.mp3.MP3(tts_response.file_path).info.length
+        segment_durations_sec = list(map(lambda r: mutagen.mp3.MP3(r.file_path).info.length, voiceover_segments))
+        audio_duration_sec = sum(segment_durations_sec)
 
         actor_lock_timeout = audio_duration_sec
         await self._get_actor_lock(npc.actor_ref).acquire(actor_lock_timeout)
@@ -249,7 +269,29 @@ class NpcSpeakerService:
         self._scene_lock.unlock_later_if_same_generation(scene_lock_timeout)
         logger.debug(f"Scene will be unlocked in {scene_lock_timeout} sec")
 
-        self._send_say_mp3_event(npc, text, target, tts_response, audio_duration_sec)
+        self._send_say_mp3_event(npc, text, target, voiceover_segments[0], segment_durations_sec[0])
+        if len(voiceover_segments) > 1:
+            asyncio.get_event_loop().create_task(self._send_next_voiceover_segments(
+                npc, text, target, voiceover_segments, segment_durations_sec, self._get_actor_lock(npc.actor_ref).generation))
+
+    def prefetch_voiceover(self, npc: Npc, sentence: str):
+        if not self._config.prefetch_voiceover:
+            return
+
+        prefetched = self._npc_ref_id_to_prefetched_voiceovers.setdefault(npc.actor_ref.ref_id, {})
+        # The tail is voiced as one piece, sentences from it can't be used.
+        if len(prefetched) >= min(self._max_prefetched_voiceovers, self._max_voiceover_segments - 1):
+            return
+
+        text_processed = self._prepare_voiceover_text(npc, sentence)
+        if len(text_processed) > 0 and text_processed not in prefetched:
+            logger.debug(f"Prefetching voiceover of {npc.actor_ref}: {text_processed}")
+            prefetched[text_processed] = asyncio.get_event_loop().create_task(self._convert_voiceover(npc, text_processed))
+
+    def discard_prefetched_voiceover(self, npc: Npc):
+        prefetched = self._npc_ref_id_to_prefetched_voiceovers.pop(npc.actor_ref.ref_id, {})
+        for task in prefetched.values():
+            task.cancel()
 
     def turn_to_actor(self, actors: list[ActorRef], target: ActorRef):
         self._producer.produce_event(Event(
@@ -329,7 +371,34 @@ class NpcSpeakerService:
             i = i + 2
         return text
 
-    async def _produce_voiceover(self, npc: Npc, text: str):
+    async def _produce_voiceover(self, npc: Npc, text: str) -> list[TtsResponse]:
+        sentences = SentenceSplitter.split(text)
+        if len(sentences) > self._max_voiceover_segments:
+            tail = ' '.join(sentences[self._max_voiceover_segments - 1:])
+            sentences = [*sentences[:self._max_voiceover_segments - 1], tail]
+
+        prefetched = self._npc_ref_id_to_prefetched_voiceovers.pop(npc.actor_ref.ref_id, {})
+
+        tasks: list[asyncio.Task[TtsResponse | None]] = []
+        for sentence in sentences:
+            text_processed = self._prepare_voiceover_text(npc, sentence)
+            if len(text_processed) == 0:
+                continue
+
+            task = prefetched.pop(text_processed, None)
+            if task is None:
+                task = asyncio.get_event_loop().create_task(self._convert_voiceover(npc, text_processed))
+            else:
+                logger.debug(f"Using prefetched voiceover of {npc.actor_ref}: {text_processed}")
+            tasks.append(task)
+
+        for unused_task in prefetched.values():
+            unused_task.cancel()
+
+        tts_responses = await asyncio.gather(*tasks)
+        return [r for r in tts_responses if r is not None]
+
+    def _prepare_voiceover_text(self, npc: Npc, text: str) -> str:
         text_processed = self._delete_non_verbal_comments(text)
 
         match npc.personality.voice.accent:
@@ -340,9 +409,25 @@ class NpcSpeakerService:
             case 'ashkhan':
                 text_processed = self._translit_ashkhan(text_processed)
 
+        return text_processed.strip()
+
+    async def _convert_voiceover(self, npc: Npc, text_processed: str) -> TtsResponse | None:
         tts_request = TtsRequest(text=text_processed, voice=npc.personality.voice)
-        tts_response = await self._tts.convert(tts_request)
-        return tts_response
+        return await self._tts.convert(tts_request)
+
+    async def _send_next_voiceover_segments(self, npc: Npc, text: str, target: ActorRef | None,
+                                            voiceover_segments: list[TtsResponse], segment_durations_sec: list[float],
+                                            actor_lock_generation: int):
+        for tts_response, duration_sec, prev_duration_sec in zip(
+                voiceover_segments[1:], segment_durations_sec[1:], segment_durations_sec):
+            await asyncio.sleep(prev_duration_sec)
+
+            # Actor lock is released early when NPC is interrupted.
+            if self._get_actor_lock(npc.actor_ref).generation != actor_lock_generation or npc.npc_data.is_dead:
+                logger.debug(f"NPC stopped speaking, dropping the rest of voiceover: npc={npc.actor_ref}")
+                return
+
+            self._send_say_mp3_event(npc, text, target, tts_response, duration_sec)
 
     def _send_say_mp3_event(self, npc: Npc, text: str, target: ActorRef | None,
                             tts_response: TtsResponse, duration_sec: float):
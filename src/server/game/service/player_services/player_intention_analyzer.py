@@ -21,7 +21,7 @@ class PlayerIntentionAnalyzer:
         sheogorath_level: Literal['normal', 'mad'] | None = None
 
     def __init__(self, llm: LlmSystem) -> None:
-        self._llm_session = llm.create_session()
+        self._llm_session = llm.create_session('player_intention')
         self._lock = asyncio.Lock()
 
     async def analyze_player_intention(self, text: str, known_topics: list[str], target: Optional[ActorRef]) -> Response:
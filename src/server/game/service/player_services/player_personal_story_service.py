@@ -52,7 +52,7 @@ class PlayerPersonalStoryService:
             ))
 
         player.personal_story.items.extend(items)
-        self._db.save_personal_story(player)
+        self._db.append_to_personal_story(player, items)
 
         self.publish_player_story()
 
@@ -1,11 +1,13 @@
 import asyncio
 from eventbus.rpc import Rpc
 from game.data.player import Player
+from game.service.providers.scene_snapshot_provider import SceneSnapshotProvider
 
 
 class PlayerProvider:
-    def __init__(self, rpc: Rpc, player: Player):
+    def __init__(self, rpc: Rpc, scene_snapshot_provider: SceneSnapshotProvider, player: Player):
         self._rpc = rpc
+        self._scene_snapshot_provider = scene_snapshot_provider
         self._local_player = player
 
         asyncio.get_event_loop().create_task(self._query_player())
@@ -26,7 +28,8 @@ class PlayerProvider:
         while True:
             await asyncio.sleep(5)
 
-            player_data_fast = await self._rpc.get_local_player_fast()
+            snapshot = self._scene_snapshot_provider.get_cached_snapshot(max_age_ms=5_000)
+            player_data_fast = snapshot.player_data_fast if snapshot else await self._rpc.get_local_player_fast()
 
             self._local_player.player_data.cell = player_data_fast.cell
             self._local_player.player_data.health_normalized = player_data_fast.health_normalized
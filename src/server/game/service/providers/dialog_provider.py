@@ -19,7 +19,12 @@ class DialogProvider:
 
         self.on_topic_story_item_update: Callable[[ActorRef], None] | None = None
 
-        consumer.register_handler(self._handle_event)
+        consumer.register_handler(self._handle_event, {
+            'dialog_open',
+            'dialog_update',
+            'dialog_close',
+            'get_local_player_response'
+        })
 
     async def _handle_event(self, event: Event):
         if event.data.type == 'dialog_open':
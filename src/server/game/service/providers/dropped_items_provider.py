@@ -15,7 +15,7 @@ class DroppedItemsProvider:
         dropped_item_id: int
 
     def __init__(self, consumer: EventConsumer, rpc: Rpc):
-        consumer.register_handler(self._handle_event)
+        consumer.register_handler(self._handle_event, {'item_dropped', 'activated'})
 
         self._rpc = rpc
         self._dropped_items: list[DroppedItemsProvider.Item] = []
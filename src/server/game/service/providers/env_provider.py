@@ -2,13 +2,15 @@ import asyncio
 from eventbus.data.env_data import EnvData
 from eventbus.rpc import Rpc
 from game.data.time import GameTime, Time
+from game.service.providers.scene_snapshot_provider import SceneSnapshotProvider
 from util.logger import Logger
 
 
 class EnvProvider:
-    def __init__(self, env_data: EnvData, rpc: Rpc) -> None:
+    def __init__(self, env_data: EnvData, rpc: Rpc, scene_snapshot_provider: SceneSnapshotProvider) -> None:
         self._env: EnvData = env_data
         self._rpc = rpc
+        self._scene_snapshot_provider = scene_snapshot_provider
 
         asyncio.get_event_loop().create_task(self._update_env_loop())
 
@@ -27,5 +29,5 @@ class EnvProvider:
         while True:
             await asyncio.sleep(15.0)
 
-            env_data = await self._rpc.get_env()
-            self._env = env_data
+            snapshot = self._scene_snapshot_provider.get_cached_snapshot(max_age_ms=15_000)
+            self._env = snapshot.env_data if snapshot else await self._rpc.get_env()
@@ -0,0 +1,56 @@
+import asyncio
+from eventbus.data.scene_snapshot import SceneSnapshot
+from eventbus.event_data.event_data_rpc import EventDataRpc
+from eventbus.rpc import Rpc
+from util.distance import Distance
+from util.logger import Logger
+from util.now_ms import now_ms
+
+logger = Logger(__name__)
+
+
+class SceneSnapshotProvider:
+    def __init__(self, rpc: Rpc) -> None:
+        self._rpc = rpc
+
+        self._radius_ingame = Distance.from_meters_to_ingame(50)
+
+        self._snapshot: SceneSnapshot | None = None
+        self._snapshot_at_ms = 0
+        self._snapshot_task: asyncio.Task[SceneSnapshot] | None = None
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def get_cached_snapshot(self, max_age_ms: int) -> SceneSnapshot | None:
+        # Never requests a snapshot, full ones are expensive for the game and only the story loop asks for them.
+        if self._snapshot and (now_ms() - self._snapshot_at_ms) <= max_age_ms:
+            return self._snapshot
+        return None
+
+    async def get_snapshot(self, max_age_ms: int) -> SceneSnapshot:
+        if self._snapshot and (now_ms() - self._snapshot_at_ms) <= max_age_ms:
+            return self._snapshot
+
+        # Everyone who needs a fresh snapshot at the same time shares one request.
+        if self._snapshot_task is None:
+            self._snapshot_task = asyncio.get_event_loop().create_task(self._request_snapshot())
+
+        return await asyncio.shield(self._snapshot_task)
+
+    async def _request_snapshot(self) -> SceneSnapshot:
+        try:
+            snapshot = await self._rpc.get_scene_snapshot(EventDataRpc.GetSceneSnapshotRequest(
+                type='get_scene_snapshot_request',
+                radius_ingame=self._radius_ingame,
+                test_line_of_sight=True
+            ))
+
+            self._snapshot = snapshot
+            self._snapshot_at_ms = now_ms()
+            logger.debug(f"Scene snapshot updated: actors={len(snapshot.actors)} npcs={len(snapshot.npc_data_list)}")
+
+            return snapshot
+        finally:
+            self._snapshot_task = None
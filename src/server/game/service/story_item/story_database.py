@@ -0,0 +1,173 @@
+import bisect
+import datetime
+from pathvalidate import sanitize_filename
+from pydantic import BaseModel, Field
+from database.database import Database
+from game.data.story import Story
+from game.data.story_item import StoryItem
+from game.data.time import Time
+from util.logger import Logger
+
+logger = Logger(__name__)
+
+
+class _StoryRewinds(BaseModel):
+    # Items which happened after the game time the story was rewound to, they stay in the journal until compaction.
+    item_ids: list[int] = Field(default=[])
+
+
+class _JournalState:
+    lines: int
+    rewinds: _StoryRewinds
+    rewound_items: list[StoryItem]
+
+    def __init__(self, lines: int, rewinds: _StoryRewinds, rewound_items: list[StoryItem]):
+        self.lines = lines
+        self.rewinds = rewinds
+        self.rewound_items = rewound_items
+
+
+class StoryDatabase:
+    def __init__(self, db: Database, max_stored_story_items: int, max_loaded_story_items: int | None = None):
+        self._db = db
+        self._max_stored_story_items = max_stored_story_items
+        # None keeps the whole stored story in memory.
+        self._max_loaded_story_items = max_loaded_story_items
+
+        # Journal is compacted back to max_stored_story_items once it grows to this many lines.
+        self._max_journal_lines = max_stored_story_items * 2
+        self._path_key_to_journal_state: dict[str, _JournalState] = {}
+
+    def save(self, path: list[str], story: Story):
+        if len(story.items) > self._max_stored_story_items:
+            story.items = story.items[-self._max_stored_story_items:]
+
+        self._save_journal(path, story.items)
+        self._trim_loaded_items(story)
+
+    def append(self, path: list[str], story: Story, items: list[StoryItem]):
+        journal_state = self._path_key_to_journal_state.get(self._get_path_key(path), None)
+        if journal_state is None:
+            # Journal content is unknown, start it over from the story in memory.
+            self.save(path, story)
+            return
+
+        self._db.append_models(path=path, values=items)
+        journal_state.lines += len(items)
+        self._trim_loaded_items(story)
+
+        if journal_state.lines > self._max_journal_lines:
+            self._compact(path)
+
+    def load(self, path: list[str], time: Time, should_rewind_story: bool) -> Story | None:
+        rewinds = self._db.load_model(type=_StoryRewinds, path=self._get_rewinds_path(path)) or _StoryRewinds()
+
+        # Rewound items are the most recent ones in the journal, so they are loaded on top of the tail.
+        last = None
+        if self._max_loaded_story_items is not None:
+            last = self._max_loaded_story_items + len(rewinds.item_ids)
+
+        loaded = self._db.load_last_models(type=StoryItem, path=path, last=last)
+        if loaded is None:
+            story = self._load_legacy(path)
+            if story is None:
+                return None
+        else:
+            journal_items, lines = loaded
+            story = self._load_journal(path, journal_items, lines, rewinds)
+
+        if should_rewind_story and self._rewind(path, story, time) and last is not None:
+            # Tail got shorter, older items are loaded in place of the rewound ones.
+            # Rewinds happen only after loading an older game save, so reading the journal again is rare.
+            return self.load(path, time, should_rewind_story)
+
+        self._trim_loaded_items(story)
+        return story
+
+    def _load_journal(self, path: list[str], journal_items: list[StoryItem], lines: int, rewinds: _StoryRewinds) -> Story:
+        items, rewound_items = self._split_rewound_items(journal_items, rewinds)
+
+        self._path_key_to_journal_state[self._get_path_key(path)] = _JournalState(lines, rewinds, rewound_items)
+
+        # Ids of rewound items are not reused.
+        next_item_id = max([*map(lambda i: i.item_id, journal_items), *rewinds.item_ids], default=0) + 1
+        return Story(next_item_id=next_item_id, items=items)
+
+    def _split_rewound_items(self, journal_items: list[StoryItem], rewinds: _StoryRewinds) -> tuple[list[StoryItem], list[StoryItem]]:
+        rewound_item_ids = set(rewinds.item_ids)
+
+        items: list[StoryItem] = []
+        rewound_items: list[StoryItem] = []
+        for item in journal_items:
+            if item.item_id in rewound_item_ids:
+                rewound_items.append(item)
+            else:
+                items.append(item)
+
+        # Stable, so items of the same game time keep the order they were told in.
+        items.sort(key=lambda i: i.time.game_time.to_unix_timestamp_sec())
+
+        return items, rewound_items
+
+    def _rewind(self, path: list[str], story: Story, time: Time) -> bool:
+        game_times = list(map(lambda i: i.time.game_time.to_unix_timestamp_sec(), story.items))
+        split_index = bisect.bisect_right(game_times, time.game_time.to_unix_timestamp_sec())
+        if split_index == len(story.items):
+            return False
+
+        items_happened_later = story.items[split_index:]
+        logger.warning(
+            f"Story at {path} has {len(items_happened_later)} items happened after {time.game_time}, rewinding it")
+
+        journal_state = self._path_key_to_journal_state[self._get_path_key(path)]
+        journal_state.rewinds.item_ids.extend(map(lambda i: i.item_id, items_happened_later))
+        journal_state.rewound_items.extend(items_happened_later)
+        self._db.save_model(path=self._get_rewinds_path(path), value=journal_state.rewinds)
+
+        story.items = story.items[:split_index]
+        return True
+
+    def _compact(self, path: list[str]):
+        logger.debug(f"Compacting story journal at {path}")
+
+        # Story in memory may be only the tail, so the journal is compacted from what is stored.
+        journal_state = self._path_key_to_journal_state[self._get_path_key(path)]
+        journal_items = self._db.load_models(type=StoryItem, path=path) or []
+        items, journal_state.rewound_items = self._split_rewound_items(journal_items, journal_state.rewinds)
+
+        self._save_journal(path, items[-self._max_stored_story_items:])
+
+    def _save_journal(self, path: list[str], items: list[StoryItem]):
+        path_key = self._get_path_key(path)
+        journal_state = self._path_key_to_journal_state.get(path_key, None)
+
+        if journal_state and len(journal_state.rewound_items) > 0:
+            backup_filename = sanitize_filename(f"{path[-1]}_backup_{datetime.datetime.now().isoformat()}")
+            logger.info(f"Backing up {len(journal_state.rewound_items)} rewound items of story at {path} to {backup_filename}")
+            self._db.save_models(path=[*path[:-1], backup_filename], values=journal_state.rewound_items)
+
+        if journal_state and len(journal_state.rewinds.item_ids) > 0:
+            self._db.save_model(path=self._get_rewinds_path(path), value=_StoryRewinds())
+
+        self._db.save_models(path=path, values=items)
+        self._path_key_to_journal_state[path_key] = _JournalState(len(items), _StoryRewinds(), [])
+
+    def _trim_loaded_items(self, story: Story):
+        if self._max_loaded_story_items is not None and len(story.items) > self._max_loaded_story_items:
+            story.items = story.items[-self._max_loaded_story_items:]
+
+    def _load_legacy(self, path: list[str]) -> Story | None:
+        story = self._db.load_model(type=Story, path=path)
+        if story is not None:
+            logger.info(f"Converting story at {path} to journal")
+            story.items.sort(key=lambda i: i.time.game_time.to_unix_timestamp_sec())
+            self.save(path, story)
+            # Deleted in the same flush as the journal is written.
+            self._db.delete_model(path=path)
+        return story
+
+    def _get_rewinds_path(self, path: list[str]) -> list[str]:
+        return [*path[:-1], f"{path[-1]}_rewinds"]
+
+    def _get_path_key(self, path: list[str]) -> str:
+        return '/'.join(path)
@@ -0,0 +1,60 @@
+class SentenceSplitter:
+    def __init__(self) -> None:
+        self._sentence_ends = ".!?…"
+        # Unbalanced bracket would hold the whole response otherwise.
+        self._max_bracket_length = 200
+        self._buffer = ''
+
+    @staticmethod
+    def split(text: str) -> list[str]:
+        splitter = SentenceSplitter()
+        sentences = splitter.feed(text)
+        sentences.extend(splitter.flush())
+        return sentences
+
+    def feed(self, chunk: str) -> list[str]:
+        self._buffer += chunk
+
+        sentences: list[str] = []
+        while True:
+            end = self._find_sentence_end()
+            if end < 0:
+                break
+
+            sentence = self._buffer[:end].strip()
+            self._buffer = self._buffer[end:]
+            if len(sentence) > 0:
+                sentences.append(sentence)
+
+        return sentences
+
+    def flush(self) -> list[str]:
+        sentence = self._buffer.strip()
+        self._buffer = ''
+        return [sentence] if len(sentence) > 0 else []
+
+    def _find_sentence_end(self) -> int:
+        # Non-verbal comments (...) and triggers [...] are never cut.
+        depth = 0
+        opened_at = 0
+        for i, c in enumerate(self._buffer):
+            if depth > 0 and i - opened_at > self._max_bracket_length:
+                depth = 0
+            if c in "([":
+                if depth == 0:
+                    opened_at = i
+                depth += 1
+            elif c in ")]":
+                depth = max(0, depth - 1)
+            elif depth == 0 and c in self._sentence_ends:
+                # Sentence is complete only once something but punctuation follows, "..." and "?!" stay whole.
+                j = i + 1
+                while j < len(self._buffer) and self._buffer[j] in self._sentence_ends:
+                    j += 1
+                if j < len(self._buffer) and self._buffer[j].isspace():
+                    return j
+                if j < len(self._buffer):
+                    continue
+                return -1
+
+        return -1
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from llm.message import LlmMessage
 
 
@@ -9,6 +10,10 @@ class LlmBackendRequest(BaseModel):
     history: list[LlmMessage]
     text: str
 
+    # Length of the leading part of system instructions which stays the same between requests,
+    # backends mark it for provider prompt caching.
+    stable_system_instructions_length: int = Field(default=0)
+
 
 class LlmBackendResponse(BaseModel):
     text: str
@@ -18,3 +23,8 @@ class AbstractLlmBackend(ABC):
     @abstractmethod
     async def send(self, request: LlmBackendRequest) -> LlmBackendResponse:
         pass
+
+    async def send_stream(self, request: LlmBackendRequest) -> AsyncIterator[str]:
+        # Backends which can't stream give the whole response as one chunk.
+        response = await self.send(request)
+        yield response.text
@@ -1,6 +1,5 @@
-import asyncio
 import time
-from typing import Any
+from typing import Any, AsyncIterator
 from util.logger import Logger
 
 from google.generativeai.client import configure  # type: ignore
@@ -18,65 +17,110 @@ class AnthropicLlmBackend(AbstractLlmBackend):
         api_key: str
         model_name: str
 
+        # 'system' passes system instructions as the system prompt, any other role passes them as a message.
         system_instructions_role: str = Field(default='system')
         max_tokens: int = Field(default=1024)
         temperature: float = Field(default=0.7)
+        # Stable part of system instructions is cached by Anthropic, cache reads are cheaper and faster.
+        prompt_caching: bool = Field(default=True)
 
     def __init__(self, config: Config) -> None:
         super().__init__()
 
         self._config = config
-        self._lock = asyncio.Lock()
 
-        self._client = anthropic.Anthropic(api_key=self._config.api_key)
+        self._client = anthropic.AsyncAnthropic(api_key=self._config.api_key)
 
     async def send(self, request: LlmBackendRequest) -> LlmBackendResponse:
-        await self._lock.acquire()
-        try:
-            history: list[Any] = []
-
-            if len(request.system_instructions) > 0:
-                history.append({
-                    "role": self._config.system_instructions_role,
-                    "content": request.system_instructions
-                })
-
-            for m in request.history:
+        history = self._build_history(request)
+
+        t0 = time.time()
+        logger.debug(f"Sent request to the model, waiting...")
+        response = await self._client.messages.create(
+            model=self._config.model_name,
+            system=self._build_system(request),
+            messages=history,
+            max_tokens=self._config.max_tokens,
+            temperature=self._config.temperature,
+            stream=False,
+        )
+        dt = time.time() - t0
+        logger.debug(f"Response from the model received in {dt} sec")
+        logger.debug(f"> {response}")
+        self._log_cache_usage(response.usage)
+
+        text: str = ''
+        if response.content and response.content[0].type == 'text':
+            text = response.content[0].text
+            text = text.strip()
+        else:
+            logger.warning(f"Received empty response from the model: {response}")
+
+        return LlmBackendResponse(
+            text=text
+        )
+
+    async def send_stream(self, request: LlmBackendRequest) -> AsyncIterator[str]:
+        history = self._build_history(request)
+
+        logger.debug(f"Sent streaming request to the model, waiting...")
+        async with self._client.messages.stream(
+            model=self._config.model_name,
+            system=self._build_system(request),
+            messages=history,
+            max_tokens=self._config.max_tokens,
+            temperature=self._config.temperature,
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+            self._log_cache_usage((await stream.get_final_message()).usage)
+
+    def _build_system(self, request: LlmBackendRequest) -> Any:
+        if self._config.system_instructions_role != 'system' or len(request.system_instructions) == 0:
+            return anthropic.NOT_GIVEN
+
+        stable_length = request.stable_system_instructions_length
+        if not self._config.prompt_caching or stable_length <= 0:
+            return request.system_instructions
+
+        system: list[Any] = [{
+            "type": "text",
+            "text": request.system_instructions[:stable_length],
+            "cache_control": {"type": "ephemeral"}
+        }]
+        if stable_length < len(request.system_instructions):
+            system.append({
+                "type": "text",
+                "text": request.system_instructions[stable_length:]
+            })
+        return system
+
+    def _log_cache_usage(self, usage: Any):
+        logger.debug(f"""Prompt cache: read={usage.cache_read_input_tokens or 0} written={
+            usage.cache_creation_input_tokens or 0} uncached={usage.input_tokens} tokens""")
+
+    def _build_history(self, request: LlmBackendRequest) -> list[Any]:
+        history: list[Any] = []
+
+        if len(request.system_instructions) > 0 and self._config.system_instructions_role != 'system':
+            history.append({
+                "role": self._config.system_instructions_role,
+                "content": request.system_instructions
+            })
+
+        for m in request.history:
+            role = "user"
+            if m.role == 'user':
                 role = "user"
-                if m.role == 'user':
-                    role = "user"
-                elif m.role == 'model':
-                    role = "assistant"
-                else:
-                    raise Exception(f"Unknown role '{m.role}'")
-
-                history.append({
-                    "role": role,
-                    "content": m.text
-                })
-
-            t0 = time.time()
-            logger.debug(f"Sent request to the model, waiting...")
-            response = self._client.messages.create(
-                model=self._config.model_name,
-                messages=history,
-                max_tokens=self._config.max_tokens,
-                temperature=self._config.temperature,
-                stream=False,
-            )
-            dt = time.time() - t0
-            logger.debug(f"Response from the model received in {dt} sec")
-            logger.debug(f"> {response}")
-
-            text: str = ''
-            if response.content and response.content[0].type == 'text':
-                text = response.content[0].text
-                text = text.strip()
+            elif m.role == 'model':
+                role = "assistant"
             else:
-                logger.warning(f"Received empty response from the model: {response}")
+                raise Exception(f"Unknown role '{m.role}'")
+
+            history.append({
+                "role": role,
+                "content": m.text
+            })
 
-            return LlmBackendResponse(
-                text=text
-            )
-        finally:
-            self._lock.release()
+        return history
@@ -1,6 +1,5 @@
-import asyncio
 import time
-from typing import Any, cast
+from typing import Any, AsyncIterator, cast
 from util.logger import Logger
 
 from google.generativeai.client import configure  # type: ignore
@@ -26,57 +25,72 @@ class MistralLlmBackend(AbstractLlmBackend):
         super().__init__()
 
         self._config = config
-        self._lock = asyncio.Lock()
 
         self._client = Mistral(api_key=self._config.api_key)
 
     async def send(self, request: LlmBackendRequest) -> LlmBackendResponse:
-        await self._lock.acquire()
-        try:
-            history: list[Any] = []
-
-            if len(request.system_instructions) > 0:
-                history.append({
-                    "role": self._config.system_instructions_role,
-                    "content": request.system_instructions
-                })
-
-            for m in request.history:
+        history = self._build_history(request)
+
+        t0 = time.time()
+        logger.debug(f"Sent request to the model, waiting...")
+        response = await self._client.chat.complete_async(
+            model=self._config.model_name,
+            messages=history,
+            max_tokens=self._config.max_tokens,
+            temperature=self._config.temperature,
+            stream=False,
+        )
+        dt = time.time() - t0
+        logger.debug(f"Response from the model received in {dt} sec")
+        logger.debug(f"> {response}")
+
+        text: str = ''
+        if response.choices and response.choices[0].message.content:
+            text = cast(str, response.choices[0].message.content)
+            text = text.strip()
+        else:
+            logger.warning(f"Received empty response from the model: {response}")
+
+        return LlmBackendResponse(
+            text=text
+        )
+
+    async def send_stream(self, request: LlmBackendRequest) -> AsyncIterator[str]:
+        history = self._build_history(request)
+
+        logger.debug(f"Sent streaming request to the model, waiting...")
+        stream = await self._client.chat.stream_async(
+            model=self._config.model_name,
+            messages=history,
+            max_tokens=self._config.max_tokens,
+            temperature=self._config.temperature,
+        )
+        async for chunk in stream:
+            choices = chunk.data.choices
+            if len(choices) > 0 and choices[0].delta.content:
+                yield cast(str, choices[0].delta.content)
+
+    def _build_history(self, request: LlmBackendRequest) -> list[Any]:
+        history: list[Any] = []
+
+        if len(request.system_instructions) > 0:
+            history.append({
+                "role": self._config.system_instructions_role,
+                "content": request.system_instructions
+            })
+
+        for m in request.history:
+            role = "user"
+            if m.role == 'user':
                 role = "user"
-                if m.role == 'user':
-                    role = "user"
-                elif m.role == 'model':
-                    role = "assistant"
-                else:
-                    raise Exception(f"Unknown role '{m.role}'")
-
-                history.append({
-                    "role": role,
-                    "content": m.text
-                })
-
-            t0 = time.time()
-            logger.debug(f"Sent request to the model, waiting...")
-            response = self._client.chat.complete(
-                model=self._config.model_name,
-                messages=history,
-                max_tokens=self._config.max_tokens,
-                temperature=self._config.temperature,
-                stream=False,
-            )
-            dt = time.time() - t0
-            logger.debug(f"Response from the model received in {dt} sec")
-            logger.debug(f"> {response}")
-
-            text: str = ''
-            if response.choices and response.choices[0].message.content:
-                text = cast(str, response.choices[0].message.content)
-                text = text.strip()
+            elif m.role == 'model':
+                role = "assistant"
             else:
-                logger.warning(f"Received empty response from the model: {response}")
+                raise Exception(f"Unknown role '{m.role}'")
+
+            history.append({
+                "role": role,
+                "content": m.text
+            })
 
-            return LlmBackendResponse(
-                text=text
-            )
-        finally:
-            self._lock.release()
+        return history
@@ -1,6 +1,5 @@
-import asyncio
 import time
-from typing import Any
+from typing import Any, AsyncIterator
 from util.logger import Logger
 
 from google.generativeai.client import configure  # type: ignore
@@ -8,7 +7,7 @@ from google.generativeai.generative_models import GenerativeModel  # type: ignor
 from pydantic import BaseModel, Field
 from llm.backend.abstract import AbstractLlmBackend, LlmBackendRequest, LlmBackendResponse
 
-from openai import OpenAI
+from openai import NOT_GIVEN, AsyncOpenAI
 
 logger = Logger(__name__)
 
@@ -23,61 +22,100 @@ class OpenAiLlmBackend(AbstractLlmBackend):
         max_tokens: int = Field(default=1024)
         temperature: float = Field(default=0.7)
 
+        # OpenAI and vLLM reuse a cached prompt prefix on their own,
+        # llama.cpp server does it only when asked with cache_prompt.
+        cache_prompt: bool = Field(default=False)
+
+        # Token usage (and cached tokens) at the end of a stream, some compatible servers reject stream_options.
+        stream_usage: bool = Field(default=False)
+
     def __init__(self, config: Config) -> None:
         super().__init__()
 
         self._config = config
-        self._lock = asyncio.Lock()
 
-        self._client = OpenAI(api_key=self._config.api_key, base_url=self._config.base_url)
+        self._client = AsyncOpenAI(api_key=self._config.api_key, base_url=self._config.base_url)
 
     async def send(self, request: LlmBackendRequest) -> LlmBackendResponse:
-        await self._lock.acquire()
-        try:
-            history: list[Any] = []
-
-            if len(request.system_instructions) > 0:
-                history.append({
-                    "role": self._config.system_instructions_role,
-                    "content": request.system_instructions
-                })
-
-            for m in request.history:
+        history = self._build_history(request)
+
+        t0 = time.time()
+        logger.debug(f"Sent request to the model, waiting...")
+        response = await self._client.chat.completions.create(
+            model=self._config.model_name,
+            messages=history,
+            max_tokens=self._config.max_tokens,
+            temperature=self._config.temperature,
+            stream=False,
+            extra_body=self._get_extra_body(),
+        )
+        dt = time.time() - t0
+        logger.debug(f"Response from the model received in {dt} sec")
+        logger.debug(f"> {response}")
+        self._log_cache_usage(response.usage)
+
+        text = response.choices[0].message.content
+        if text:
+            text = text.strip()
+        else:
+            logger.warning(f"Received empty response from the model: {response}")
+            text = ''
+
+        return LlmBackendResponse(
+            text=text
+        )
+
+    async def send_stream(self, request: LlmBackendRequest) -> AsyncIterator[str]:
+        history = self._build_history(request)
+
+        logger.debug(f"Sent streaming request to the model, waiting...")
+        stream = await self._client.chat.completions.create(
+            model=self._config.model_name,
+            messages=history,
+            max_tokens=self._config.max_tokens,
+            temperature=self._config.temperature,
+            stream=True,
+            stream_options={"include_usage": True} if self._config.stream_usage else NOT_GIVEN,
+            extra_body=self._get_extra_body(),
+        )
+        async for chunk in stream:
+            if len(chunk.choices) > 0 and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if chunk.usage:
+                self._log_cache_usage(chunk.usage)
+
+    def _get_extra_body(self) -> dict[str, Any] | None:
+        return {"cache_prompt": True} if self._config.cache_prompt else None
+
+    def _log_cache_usage(self, usage: Any):
+        if usage is None:
+            return
+
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = (details and details.cached_tokens) or 0
+        logger.debug(f"Prompt cache: read={cached_tokens} prompt={usage.prompt_tokens} tokens")
+
+    def _build_history(self, request: LlmBackendRequest) -> list[Any]:
+        history: list[Any] = []
+
+        if len(request.system_instructions) > 0:
+            history.append({
+                "role": self._config.system_instructions_role,
+                "content": request.system_instructions
+            })
+
+        for m in request.history:
+            role = "user"
+            if m.role == 'user':
                 role = "user"
-                if m.role == 'user':
-                    role = "user"
-                elif m.role == 'model':
-                    role = "assistant"
-                else:
-                    raise Exception(f"Unknown role '{m.role}'")
-
-                history.append({
-                    "role": role,
-                    "content": m.text
-                })
-
-            t0 = time.time()
-            logger.debug(f"Sent request to the model, waiting...")
-            response = self._client.chat.completions.create(
-                model=self._config.model_name,
-                messages=history,
-                max_tokens=self._config.max_tokens,
-                temperature=self._config.temperature,
-                stream=False,
-            )
-            dt = time.time() - t0
-            logger.debug(f"Response from the model received in {dt} sec")
-            logger.debug(f"> {response}")
-
-            text = response.choices[0].message.content
-            if text:
-                text = text.strip()
+            elif m.role == 'model':
+                role = "assistant"
             else:
-                logger.warning(f"Received empty response from the model: {response}")
-                text = ''
-
-            return LlmBackendResponse(
-                text=text
-            )
-        finally:
-            self._lock.release()
+                raise Exception(f"Unknown role '{m.role}'")
+
+            history.append({
+                "role": role,
+                "content": m.text
+            })
+
+        return history
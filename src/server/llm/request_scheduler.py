@@ -0,0 +1,118 @@
+import asyncio
+import heapq
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Literal, Optional
+from pydantic import BaseModel, Field
+from util.logger import Logger
+
+logger = Logger(__name__)
+
+# Requests of the player waiting for a reply go first, background work goes last.
+LlmRequestPriority = Literal['player_intention', 'npc_response', 'pick_actor', 'personality']
+
+_PRIORITY_TO_ORDER: dict[str, int] = {
+    'player_intention': 0,
+    'npc_response': 1,
+    'pick_actor': 2,
+    'personality': 3,
+}
+
+
+class LlmRequestScheduler:
+    class Config(BaseModel):
+        max_concurrent_requests: int = Field(default=4)
+        # Limit of the LLM provider, None for no limit.
+        max_requests_per_minute: Optional[int] = Field(default=None)
+
+    def __init__(self, config: Config) -> None:
+        self._config = config
+
+        self._running_requests = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._next_waiter_id = 0
+
+        self._request_started_at: deque[float] = deque()
+        self._rate_limit_window_sec = 60.0
+        self._rate_limit_wakeup: asyncio.TimerHandle | None = None
+
+    async def run[T](self, priority: LlmRequestPriority, send: Callable[[], Awaitable[T]]) -> T:
+        await self._acquire(priority)
+        try:
+            return await send()
+        finally:
+            self._running_requests -= 1
+            self._wake_up_waiters()
+
+    async def stream[T](self, priority: LlmRequestPriority, send_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        # Slot is held until the stream is fully read or closed.
+        await self._acquire(priority)
+        try:
+            async with aclosing(send_stream()) as stream:
+                async for chunk in stream:
+                    yield chunk
+        finally:
+            self._running_requests -= 1
+            self._wake_up_waiters()
+
+    async def _acquire(self, priority: LlmRequestPriority):
+        if len(self._waiters) == 0 and self._can_start_request():
+            self._start_request()
+            return
+
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(self._waiters, (_PRIORITY_TO_ORDER[priority], self._next_waiter_id, future))
+        self._next_waiter_id += 1
+        logger.debug(f"LLM request with priority {priority} is queued, waiting={len(self._waiters)}")
+        # Nothing may be running to wake waiters up when it finishes, e.g. the rate limit window is just full.
+        self._wake_up_waiters()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was already handed over, pass it on.
+                self._running_requests -= 1
+                self._wake_up_waiters()
+            else:
+                self._waiters = [w for w in self._waiters if w[2] is not future]
+                heapq.heapify(self._waiters)
+            raise
+
+    def _can_start_request(self) -> bool:
+        if self._running_requests >= self._config.max_concurrent_requests:
+            return False
+
+        if self._config.max_requests_per_minute is not None:
+            now = time.monotonic()
+            while len(self._request_started_at) > 0 and now - self._request_started_at[0] >= self._rate_limit_window_sec:
+                self._request_started_at.popleft()
+            if len(self._request_started_at) >= self._config.max_requests_per_minute:
+                return False
+
+        return True
+
+    def _start_request(self):
+        self._running_requests += 1
+        if self._config.max_requests_per_minute is not None:
+            self._request_started_at.append(time.monotonic())
+
+    def _wake_up_waiters(self):
+        while len(self._waiters) > 0 and self._can_start_request():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+
+            self._start_request()
+            future.set_result(None)
+
+        if len(self._waiters) > 0 and self._rate_limit_wakeup is None and \
+                self._running_requests < self._config.max_concurrent_requests:
+            # Blocked by the rate limit, nothing else would wake waiters up.
+            wait_sec = self._rate_limit_window_sec - (time.monotonic() - self._request_started_at[0])
+            self._rate_limit_wakeup = asyncio.get_event_loop().call_later(wait_sec, self._on_rate_limit_window_moved)
+
+    def _on_rate_limit_window_moved(self):
+        self._rate_limit_wakeup = None
+        self._wake_up_waiters()
@@ -1,4 +1,7 @@
+from contextlib import aclosing
+from typing import AsyncIterator
 from llm.llm_logger import LlmLogger
+from llm.request_scheduler import LlmRequestPriority, LlmRequestScheduler
 from util.logger import Logger
 from llm.backend.abstract import AbstractLlmBackend, LlmBackendRequest
 from llm.message import LlmMessage
@@ -7,24 +10,44 @@ logger = Logger(__name__)
 
 
 class LlmSession:
-    def __init__(self, backend: AbstractLlmBackend, llm_logger: LlmLogger | None) -> None:
+    def __init__(self, backend: AbstractLlmBackend, scheduler: LlmRequestScheduler, priority: LlmRequestPriority,
+                 llm_logger: LlmLogger | None) -> None:
         self._backend = backend
+        self._scheduler = scheduler
+        self._priority = priority
         self._llm_logger = llm_logger
 
         self._system_instructions = ''
+        self._stable_system_instructions_length = 0
         self._messages: list[LlmMessage] = []
 
-    def reset(self, *, system_instructions: str, messages: list[LlmMessage]):
+    def reset(self, *, system_instructions: str, messages: list[LlmMessage], stable_system_instructions_length: int = 0):
         self._system_instructions = system_instructions
+        self._stable_system_instructions_length = stable_system_instructions_length
         self._messages = messages
 
     async def send_message(self, *, user_text: str, log_name: str | None = None, log_context: str | None = None) -> str:
-        request = LlmBackendRequest(
-            system_instructions=self._system_instructions,
-            history=self._messages,
-            text=user_text
-        )
+        request = self._create_request(user_text)
+
+        response = await self._scheduler.run(self._priority, lambda: self._backend.send(request))
+
+        self._add_response(user_text, response.text, log_name, log_context)
+        return response.text
+
+    async def stream_message(self, *, user_text: str, log_name: str | None = None,
+                             log_context: str | None = None) -> AsyncIterator[str]:
+        request = self._create_request(user_text)
+
+        chunks: list[str] = []
+        # Closed right away if the caller stops early, so the scheduler slot is released.
+        async with aclosing(self._scheduler.stream(self._priority, lambda: self._backend.send_stream(request))) as stream:
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
 
+        self._add_response(user_text, ''.join(chunks).strip(), log_name, log_context)
+
+    def _create_request(self, user_text: str) -> LlmBackendRequest:
         logger.debug(f"[SYSTEM:0] {self._system_instructions}")
         message_index = 1
         for m in self._messages:
@@ -35,20 +58,25 @@ class LlmSession:
             message_index = message_index + 1
 
         logger.info(f"< {user_text}")
-        response = await self._backend.send(request)
-        logger.info(f"> {response.text}")
+        return LlmBackendRequest(
+            system_instructions=self._system_instructions,
+            history=self._messages,
+            text=user_text,
+            stable_system_instructions_length=self._stable_system_instructions_length
+        )
+
+    def _add_response(self, user_text: str, response_text: str, log_name: str | None, log_context: str | None):
+        logger.info(f"> {response_text}")
 
         if self._llm_logger:
             self._llm_logger.log(
                 system_instructions=self._system_instructions,
                 history=self._messages,
                 user_message=user_text,
-                model_response=response.text,
+                model_response=response_text,
                 log_name=log_name,
                 log_context=log_context
             )
 
         self._messages.append(LlmMessage(role='user', text=user_text))
-        self._messages.append(LlmMessage(role='model', text=response.text))
-
-        return response.text
+        self._messages.append(LlmMessage(role='model', text=response_text))
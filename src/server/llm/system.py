@@ -2,6 +2,7 @@ from llm.backend.anthropic import AnthropicLlmBackend
 from llm.backend.mistral import MistralLlmBackend
 from llm.backend.openai import OpenAiLlmBackend
 from llm.llm_logger import LlmLogger
+from llm.request_scheduler import LlmRequestPriority, LlmRequestScheduler
 from util.logger import Logger
 from typing import Literal, Optional, Union
 
@@ -37,11 +38,13 @@ class LlmSystem:
 
         system: Union[Dummy, Google, OpenAi, Mistral, Anthropic] = Field(discriminator='type')
         llm_logger: Optional[LlmLogger.Config] = Field(default=None)
+        scheduler: LlmRequestScheduler.Config = Field(default=LlmRequestScheduler.Config())
 
     def __init__(self, config: Config) -> None:
         self._config = config
         self._backend = self._create_backend()
         self._llm_logger = LlmLogger(config.llm_logger) if config.llm_logger else None
+        self._scheduler = LlmRequestScheduler(config.scheduler)
 
     def is_dummy(self) -> bool:
         return self._config.system.type == 'dummy'
@@ -68,5 +71,5 @@ class LlmSystem:
 
         return backend
 
-    def create_session(self):
-        return LlmSession(self._backend, self._llm_logger)
+    def create_session(self, priority: LlmRequestPriority):
+        return LlmSession(self._backend, self._scheduler, priority, self._llm_logger)
@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+from typing import Literal
+from pydantic import BaseModel
+from database.database import Database
+
+
+class _Model(BaseModel):
+    v: int
+
+
+class DatabaseTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _create_db(self, backend: Literal['files', 'sqlite'], model_format: Literal['json', 'yaml']) -> Database:
+        return Database(Database.Config(directory=self._directory.name, backend=backend, model_format=model_format), 'player')
+
+    async def test_model_saved_in_new_format_replaces_other_format(self):
+        for backend in ['files', 'sqlite']:
+            with self.subTest(backend=backend):
+                self._directory.cleanup()
+                self._directory = tempfile.TemporaryDirectory()
+
+                db = self._create_db(backend, 'yaml')
+                db.save_model(path=['m'], value=_Model(v=1))
+                db.flush()
+
+                db = self._create_db(backend, 'json')
+                db.save_model(path=['m'], value=_Model(v=2))
+                db.flush()
+
+                db = self._create_db(backend, 'yaml')
+                self.assertEqual(db.load_model(type=_Model, path=['m']), _Model(v=2))
+
+    async def test_failed_writes_are_retried(self):
+        db = self._create_db('files', 'json')
+        write = db._backend.write
+        db._backend.write = lambda writes: writes  # type: ignore
+
+        db.save_models(path=['journal'], values=[_Model(v=1)])
+        db.flush()
+        db.append_models(path=['journal'], values=[_Model(v=2)])
+        self.assertEqual(db.load_models(type=_Model, path=['journal']), [_Model(v=1), _Model(v=2)])
+
+        db._backend.write = write  # type: ignore
+        db.flush()
+        self.assertEqual(db._backend.read('journal.jsonl'), '{"v":1}\n{"v":2}\n')
+
+    async def test_loads_read_writes_being_flushed(self):
+        db = self._create_db('files', 'json')
+        loaded: list[_Model | None] = []
+
+        def write(writes):
+            # Runs while the flush is in progress.
+            loaded.append(db.load_model(type=_Model, path=['m']))
+            return {}
+        db._backend.write = write  # type: ignore
+
+        db.save_model(path=['m'], value=_Model(v=1))
+        db.flush()
+        self.assertEqual(loaded, [_Model(v=1)])
+
+    async def test_loads_read_appends_being_flushed(self):
+        for backend in ['files', 'sqlite']:
+            with self.subTest(backend=backend):
+                db = self._create_db(backend, 'json')
+                db.save_models(path=['journal_' + backend], values=[_Model(v=1)])
+                db.flush()
+
+                loaded: list[list[_Model] | None] = []
+                write = db._backend.write
+
+                def write_and_load(writes):
+                    loaded.append(db.load_models(type=_Model, path=['journal_' + backend]))
+                    failed_writes = write(writes)
+                    loaded.append(db.load_models(type=_Model, path=['journal_' + backend]))
+                    return failed_writes
+                db._backend.write = write_and_load  # type: ignore
+
+                db.append_models(path=['journal_' + backend], values=[_Model(v=2)])
+                db.flush()
+                self.assertEqual(loaded, [[_Model(v=1), _Model(v=2)]] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import types
+import unittest
+from typing import Any, Literal, Union, get_args, get_origin
+from pydantic import BaseModel
+from eventbus.backend.mwse_tcp import MwseTcpEventBusBackend, _ActiveClient
+from eventbus.event import Event
+from eventbus.event_data.event_data_from_game import EventDataFromGameUnion
+from eventbus.event_data.event_data_from_server import EventDataFromServerUnion
+from eventbus.event_data.event_data_rpc import EventDataRpcUnion
+
+
+def _sample(annotation: Any) -> Any:
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+
+    if annotation is Any:
+        return "Сейда Нин"
+    if origin is Literal:
+        return args[0]
+    if origin is Union or origin is types.UnionType:
+        # Optional values are filled in, so nested models are covered too.
+        return _sample(next(a for a in args if a is not type(None)))
+    if origin is list:
+        return [_sample(args[0])]
+    if origin is tuple:
+        return tuple(_sample(a) for a in args if a is not Ellipsis)
+    if origin is dict:
+        return {_sample(args[0]): _sample(args[1])}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation.model_validate({
+            name: _sample(field.annotation) for name, field in annotation.model_fields.items()
+        })
+    if annotation is bool:
+        return True
+    if annotation is int:
+        return 1
+    if annotation is float:
+        return 1.5
+    if annotation is str:
+        return "Сейда Нин"
+    raise Exception(f"No sample for {annotation}")
+
+
+class MwseTcpWireFormatTest(unittest.TestCase):
+    def test_msgpack_frames_parse_like_json_frames(self):
+        event_data_types = [*get_args(EventDataFromGameUnion), *get_args(EventDataFromServerUnion), *get_args(EventDataRpcUnion)]
+
+        for encoding in ['utf-8', 'cp1251']:
+            backend = MwseTcpEventBusBackend(MwseTcpEventBusBackend.Config(port=0, encoding=encoding, wire_format='msgpack'))
+            client = _ActiveClient(peer_name='test', writer=None)  # type: ignore
+
+            for event_data_type in event_data_types:
+                with self.subTest(encoding=encoding, type=event_data_type.__qualname__):
+                    event = Event(data=_sample(event_data_type))
+
+                    from_json = backend._parse_event(client, event.model_dump_json().encode(encoding), False)
+                    from_msgpack = backend._parse_event(client, backend._pack_msgpack(event.model_dump(mode='json')), True)
+
+                    self.assertEqual(from_msgpack, from_json)
+                    self.assertEqual(from_msgpack, event)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+from contextlib import aclosing
+from llm.request_scheduler import LlmRequestScheduler
+
+
+class LlmRequestSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_request_queued_by_full_rate_window_is_woken_up(self):
+        scheduler = LlmRequestScheduler(LlmRequestScheduler.Config(max_concurrent_requests=4, max_requests_per_minute=2))
+        scheduler._rate_limit_window_sec = 0.3
+
+        async def send() -> int:
+            return 1
+
+        # Window is full and nothing is running anymore.
+        await scheduler.run('npc_response', send)
+        await scheduler.run('npc_response', send)
+
+        result = await asyncio.wait_for(scheduler.run('npc_response', send), timeout=3)
+        self.assertEqual(result, 1)
+
+    async def test_requests_start_in_priority_order(self):
+        scheduler = LlmRequestScheduler(LlmRequestScheduler.Config(max_concurrent_requests=1))
+        started: list[str] = []
+        release = asyncio.Event()
+
+        async def blocking_send():
+            await release.wait()
+
+        def send_as(name: str):
+            async def send():
+                started.append(name)
+            return send
+
+        blocking = asyncio.create_task(scheduler.run('npc_response', blocking_send))
+        await asyncio.sleep(0)
+        background = asyncio.create_task(scheduler.run('personality', send_as('personality')))
+        player = asyncio.create_task(scheduler.run('player_intention', send_as('player_intention')))
+        await asyncio.sleep(0)
+
+        release.set()
+        await asyncio.gather(blocking, background, player)
+        self.assertEqual(started, ['player_intention', 'personality'])
+
+    async def test_stream_closed_early_releases_its_slot(self):
+        scheduler = LlmRequestScheduler(LlmRequestScheduler.Config(max_concurrent_requests=1))
+
+        async def send_stream():
+            yield 'a'
+            yield 'b'
+
+        async with aclosing(scheduler.stream('npc_response', send_stream)) as stream:
+            async for _ in stream:
+                break
+
+        async def send() -> int:
+            return 1
+
+        self.assertEqual(await asyncio.wait_for(scheduler.run('npc_response', send), timeout=1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
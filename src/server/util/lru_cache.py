@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from typing import Callable
+
+
+class LruCache[K, V]:
+    def __init__(self, max_entries: int, max_weight: int | None = None,
+                 get_weight: Callable[[V], int] = lambda _: 1,
+                 on_evict: Callable[[K, V], None] | None = None,
+                 can_evict: Callable[[K, V], bool] = lambda _k, _v: True) -> None:
+        self._max_entries = max_entries
+        self._max_weight = max_weight
+        self._get_weight = get_weight
+        self._on_evict = on_evict
+        self._can_evict = can_evict
+
+        self._key_to_value: OrderedDict[K, V] = OrderedDict()
+        self._key_to_weight: dict[K, int] = {}
+        self._total_weight = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._key_to_value)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._key_to_value
+
+    @property
+    def total_weight(self) -> int:
+        return self._total_weight
+
+    def peek(self, key: K) -> V | None:
+        return self._key_to_value.get(key, None)
+
+    def get(self, key: K) -> V | None:
+        value = self._key_to_value.get(key, None)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._key_to_value.move_to_end(key)
+        # Values may grow while cached, e.g. a story gets new items.
+        self._update_weight(key, value)
+        self._evict_over_limits()
+        return value
+
+    def put(self, key: K, value: V):
+        self._key_to_value[key] = value
+        self._key_to_value.move_to_end(key)
+        self._update_weight(key, value)
+        self._evict_over_limits()
+
+    def clear(self):
+        while len(self._key_to_value) > 0:
+            self._evict(next(iter(self._key_to_value)))
+
+    def _update_weight(self, key: K, value: V):
+        weight = self._get_weight(value)
+        self._total_weight += weight - self._key_to_weight.get(key, 0)
+        self._key_to_weight[key] = weight
+
+    def _evict_over_limits(self):
+        # The most recently used value always stays, even if it is over the weight limit alone.
+        # Values which can't be evicted right now are skipped, the cache stays over its limits until they can.
+        while len(self._key_to_value) > 1 and (
+            len(self._key_to_value) > self._max_entries or
+            (self._max_weight is not None and self._total_weight > self._max_weight)
+        ):
+            key = self._find_oldest_evictable_key()
+            if key is None:
+                return
+
+            self.evictions += 1
+            self._evict(key)
+
+    def _find_oldest_evictable_key(self) -> K | None:
+        most_recent_key = next(reversed(self._key_to_value))
+        for key, value in self._key_to_value.items():
+            if key != most_recent_key and self._can_evict(key, value):
+                return key
+        return None
+
+    def _evict(self, key: K):
+        value = self._key_to_value.pop(key)
+        self._total_weight -= self._key_to_weight.pop(key)
+
+        if self._on_evict:
+            self._on_evict(key, value)